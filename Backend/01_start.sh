@@ -2,12 +2,14 @@
 
 # HomeLedger 后端服务启动脚本
 # 启动 FastAPI 服务器，支持热重载，日志输出到 server.log
+# SERVER_MODE=production 时使用 gunicorn 启动多个工作进程（配置见 gunicorn_conf.py），不热重载
 
 # 设置变量
 APP="app.main:app"
 HOST="0.0.0.0"
 PORT=8000
 LOG_FILE="server.log"
+SERVER_MODE="${SERVER_MODE:-development}"
 
 # 检查是否已安装依赖
 if [ ! -f "requirements.txt" ]; then
@@ -22,8 +24,8 @@ if ! command -v python3 &> /dev/null; then
 fi
 
 # 检查是否已安装依赖包
-if ! python3 -c "import uvicorn" &> /dev/null; then
-    echo "警告: uvicorn 未安装，尝试安装依赖..."
+if ! python3 -c "import uvicorn, gunicorn" &> /dev/null; then
+    echo "警告: uvicorn 或 gunicorn 未安装，尝试安装依赖..."
     pip install -r requirements.txt
 fi
 
@@ -51,12 +53,17 @@ fi
 
 echo "🚀 启动 HomeLedger 后端服务..."
 echo "应用: $APP"
+echo "模式: $SERVER_MODE"
 echo "地址: http://$HOST:$PORT"
 echo "日志文件: $LOG_FILE"
 echo ""
 
 # 启动服务
-nohup uvicorn $APP --reload --host $HOST --port $PORT > $LOG_FILE 2>&1 &
+if [ "$SERVER_MODE" = "production" ]; then
+    BIND="$HOST:$PORT" nohup gunicorn -c gunicorn_conf.py $APP > $LOG_FILE 2>&1 &
+else
+    nohup uvicorn $APP --reload --host $HOST --port $PORT > $LOG_FILE 2>&1 &
+fi
 
 # 获取进程ID
 SERVER_PID=$!
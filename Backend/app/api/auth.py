@@ -1,29 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import timedelta
 from typing import Optional
 from pydantic import BaseModel
+import logging
 import os
 
 from app.core.database import get_db
 from app.core.config import settings
-from app.core.auth import create_access_token
+from app.core.auth import create_access_token, hash_password_async, verify_password_async, password_needs_rehash
 from app.models.user import User
 from app.schemas.auth import Token, TokenData, LoginRequest, RegisterRequest
 from app.schemas.user import User as UserSchema
-from app.core.dependencies import get_current_active_user
+from app.core.dependencies import get_current_active_user, invalidate_user_cache
+from app.core.uploads import receive_upload
+from app.services.avatars import InvalidImageError, avatar_url, avatar_urls, build_variants_async
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
+def _get_user_by_name(db: Session, user_name: str) -> Optional[User]:
+    """按用户名查找用户"""
+    return db.query(User).filter(User.user_name == user_name).first()
+
+
+def _save(db: Session, obj=None):
+    """提交会话（可选先添加对象并在提交后刷新）"""
+    if obj is not None:
+        db.add(obj)
+    db.commit()
+    if obj is not None:
+        db.refresh(obj)
+
+
+# 注册、登录和修改密码需要计算 bcrypt，路由定义为 async：
+# 哈希在进程池中计算，数据库操作通过 run_in_threadpool 执行，均不阻塞事件循环
 @router.post("/register", response_model=Token)
-def register(register_data: RegisterRequest, db: Session = Depends(get_db)):
+async def register(register_data: RegisterRequest, db: Session = Depends(get_db)):
     """注册"""
     # 检查用户名是否已存在
-    existing_user = db.query(User).filter(User.user_name == register_data.username).first()
+    existing_user = await run_in_threadpool(_get_user_by_name, db, register_data.username)
     if existing_user:
-        print(f"注册失败 - 用户名已存在: {register_data.username}")
+        logger.info("注册失败 - 用户名已存在: %s", register_data.username)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="用户名已存在"
@@ -39,13 +60,11 @@ def register(register_data: RegisterRequest, db: Session = Depends(get_db)):
     )
     
     # 设置密码
-    user.set_password(register_data.password)
+    user.password_hash = await hash_password_async(register_data.password)
     
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    await run_in_threadpool(_save, db, user)
     
-    print(f"新用户注册: {user.nickname} (ID: {user.id})")
+    logger.info("新用户注册", extra={"user_id": str(user.id)})
     
     # 创建访问令牌
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
@@ -58,41 +77,44 @@ def register(register_data: RegisterRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     """登录"""
     # 用户名密码登录
     if login_data.username and login_data.password:
         # 只在 user_name 字段中查找用户
-        user = db.query(User).filter(User.user_name == login_data.username).first()
+        user = await run_in_threadpool(_get_user_by_name, db, login_data.username)
         # 如果找不到，返回错误
         if not user:
-            print(f"登录失败 - 找不到用户: {login_data.username}")
+            logger.info("登录失败 - 找不到用户: %s", login_data.username)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="用户名或密码错误"
             )
         
         # 验证密码
-        print(f"登录验证 - 用户名: {login_data.username}, 用户ID: {user.id if user else '无'}")
-        if not user.check_password(login_data.password):
-            print(f"登录失败 - 密码验证失败: {login_data.username}")
+        if not await verify_password_async(login_data.password, user.password_hash):
+            logger.info("登录失败 - 密码验证失败: %s", login_data.username)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="用户名或密码错误"
             )
         
-        print(f"用户登录成功: {user.user_name or user.nickname} (ID: {user.id})")
+        # 旧的 SHA-256 哈希或低代价哈希，在登录成功时升级为当前方案
+        if password_needs_rehash(user.password_hash):
+            user.password_hash = await hash_password_async(login_data.password)
+            await run_in_threadpool(_save, db)
+            invalidate_user_cache(user.id)
+        
+        logger.debug("用户登录成功", extra={"user_id": str(user.id)})
     # 处理微信登录
     elif login_data.code:
         # 这里应该调用微信登录API验证code
         # 为了演示，我们假设用户已经存在
-        user = db.query(User).first()
+        user = await run_in_threadpool(lambda: db.query(User).first())
         if not user:
             # 创建新用户
             user = User(nickname="微信用户")
-            db.add(user)
-            db.commit()
-            db.refresh(user)
+            await run_in_threadpool(_save, db, user)
     else:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -142,30 +164,28 @@ def update_user_info(
     db: Session = Depends(get_db)
 ):
     """更新用户信息"""
-    print(f"更新用户信息 - 用户ID: {current_user.id}")
-    print(f"更新用户信息 - 收到的数据: {update_data.dict()}")
+    # 只记录修改了哪些字段，不记录取值（手机号、邮箱等属于个人信息）
+    logger.debug(
+        "更新用户信息",
+        extra={"user_id": str(current_user.id), "fields": sorted(update_data.model_dump(exclude_none=True))}
+    )
     
     # 更新用户信息
     if update_data.nickname is not None:
         current_user.nickname = update_data.nickname
-        print(f"更新用户信息 - 昵称: {update_data.nickname}")
     if hasattr(update_data, 'user_name') and update_data.user_name is not None:
         current_user.user_name = update_data.user_name
-        print(f"更新用户信息 - 用户名: {update_data.user_name}")
     if hasattr(update_data, 'message') and update_data.message is not None:
         current_user.message = update_data.message
-        print(f"更新用户信息 - 留言: {update_data.message}")
     if hasattr(update_data, 'phone') and update_data.phone is not None:
         current_user.phone = update_data.phone
-        print(f"更新用户信息 - 手机号: {update_data.phone}")
     if hasattr(update_data, 'email') and update_data.email is not None:
         current_user.email = update_data.email
-        print(f"更新用户信息 - 邮箱: {update_data.email}")
     if hasattr(update_data, 'role') and update_data.role is not None:
         current_user.role = update_data.role
-        print(f"更新用户信息 - 角色: {update_data.role}")
     
     db.commit()
+    invalidate_user_cache(current_user.id)
     db.refresh(current_user)
     
     return UserSchema.from_orm(current_user)
@@ -176,66 +196,104 @@ class PasswordUpdate(BaseModel):
     new_password: str
 
 @router.put("/me/password")
-def update_password(
+async def update_password(
     password_data: PasswordUpdate,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """修改密码"""
-    print(f"修改密码 - 用户ID: {current_user.id}")
-    print(f"修改密码 - 收到的数据: {password_data.dict()}")
-    
     # 验证旧密码
-    if not current_user.check_password(password_data.old_password):
-        print(f"修改密码 - 旧密码验证失败")
+    if not await verify_password_async(password_data.old_password, current_user.password_hash):
+        logger.info("修改密码 - 旧密码验证失败", extra={"user_id": str(current_user.id)})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="旧密码错误"
         )
     
     # 设置新密码
-    current_user.set_password(password_data.new_password)
-    db.commit()
-    print(f"修改密码 - 密码更新成功")
+    current_user.password_hash = await hash_password_async(password_data.new_password)
+    await run_in_threadpool(_save, db)
+    invalidate_user_cache(current_user.id)
+    logger.info("修改密码 - 密码更新成功", extra={"user_id": str(current_user.id)})
     
     return {"message": "密码修改成功"}
 
 
-@router.post("/me/avatar")
+AVATAR_DIR = "app/static/avatars"
+
+
+def _set_avatar_key(db: Session, user: User, avatar_key: str):
+    user.avatar_key = avatar_key
+    db.commit()
+    db.refresh(user)
+
+
+@router.post(
+    "/me/avatar",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                        "required": ["file"]
+                    }
+                }
+            }
+        }
+    }
+)
 async def upload_avatar(
-    file: UploadFile = File(...),
+    request: Request,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """上传用户头像"""
-    print(f"上传头像 - 用户ID: {current_user.id}")
-    print(f"上传头像 - 文件名: {file.filename}")
-    
+    """上传用户头像
+
+    请求体按分块流式写入头像目录下的临时文件，不整体读入内存，超过 avatar_max_bytes
+    时返回 413。随后在进程池中生成各尺寸的 WebP/PNG 变体，以图片内容的哈希作为
+    avatar_key：相同图片只存一份，重新上传不同图片会得到新的 URL，旧 URL 内容不变。
+    """
     # 确保上传目录存在
-    upload_dir = "app/static/avatars"
-    if not os.path.exists(upload_dir):
-        os.makedirs(upload_dir)
+    await run_in_threadpool(os.makedirs, AVATAR_DIR, exist_ok=True)
     
-    # 生成唯一的文件名
-    file_extension = os.path.splitext(file.filename)[1]
-    avatar_key = f"{current_user.id}{file_extension}"
-    file_path = os.path.join(upload_dir, avatar_key)
+    upload = await receive_upload(request, "file", AVATAR_DIR, settings.avatar_max_bytes)
     
-    # 保存文件
     try:
-        contents = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(contents)
-        
-        # 更新用户的avatar_key
-        current_user.avatar_key = avatar_key
-        db.commit()
-        db.refresh(current_user)
+        avatar_key = await build_variants_async(upload.path, AVATAR_DIR)
+    except InvalidImageError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unsupported image type"
+        )
+    except BaseException:
+        # 在等待进程池时被取消（如客户端断开）时 build_variants 没有运行，
+        # 临时文件不会被它删除，而头像目录是公开访问的
+        try:
+            os.remove(upload.path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    # 保存头像键；变体文件可能被其他用户共用，旧头像文件不在此删除
+    try:
+        await run_in_threadpool(_set_avatar_key, db, current_user, avatar_key)
+        invalidate_user_cache(current_user.id)
         
-        print(f"上传头像 - 成功: {avatar_key}")
-        return {"message": "头像上传成功", "avatar_key": avatar_key, "avatar_url": f"http://127.0.0.1:8000/static/avatars/{avatar_key}"}
-    except Exception as e:
-        print(f"上传头像 - 失败: {str(e)}")
+        logger.info(
+            "上传头像 - 成功",
+            extra={"user_id": str(current_user.id), "avatar_key": avatar_key, "bytes": upload.size}
+        )
+        return {
+            "message": "头像上传成功",
+            "avatar_key": avatar_key,
+            "avatar_url": avatar_url(avatar_key),
+            "avatar_urls": avatar_urls(avatar_key)
+        }
+    except Exception:
+        logger.exception("上传头像 - 失败", extra={"user_id": str(current_user.id)})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="头像上传失败"
@@ -1,31 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
 from app.core.database import get_db
 from app.models.user import User
 from app.models.family import Family, FamilyMember
 from app.schemas.family import Family as FamilySchema, FamilyCreate, FamilyUpdate, FamilyMember as FamilyMemberSchema, FamilyMemberCreate, FamilyMemberUpdate
-from app.core.dependencies import get_current_active_user
+from app.core.dependencies import get_current_active_user, get_family_membership, get_family_admin, get_read_db
+from app.core.membership import Membership, get_membership, invalidate_membership
+from app.core.pagination import MAX_PAGE_SIZE, paginate
+from app.core.etag import check_family_etag, check_user_families_etag, commit_and_bump_version
+from app.core.replicas import read_cache_ttl
+from app.core.response_cache import response_cache, family_scope, user_scope
+from app.core.sql_budget import sql_budget
+from app.services.ledger import current_month, remaining_quotas
 
 router = APIRouter()
 
 
+def _with_remaining_quota(db: Session, members: List[FamilyMember]) -> List[FamilyMemberSchema]:
+    """为成员附加当月剩余额度"""
+    remaining = remaining_quotas(db, {m.id: m.monthly_quota for m in members}, current_month())
+    return [
+        FamilyMemberSchema.model_validate(m).model_copy(update={"remaining_quota": remaining[m.id]})
+        for m in members
+    ]
+
+
 @router.get("", response_model=List[FamilySchema])
 def get_families(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取家庭列表"""
+    version = check_user_families_etag(db, current_user.id, request, response)
+    cache_key = response_cache.key("families", user_scope(current_user.id), version, "user", request)
+    cached = response_cache.get(cache_key, response)
+    if cached is not None:
+        return cached
+    
     # 获取用户参与的所有家庭
-    families = db.query(Family).join(FamilyMember).filter(FamilyMember.user_id == current_user.id).offset(skip).limit(limit).all()
-    return families
+    query = db.query(Family).join(FamilyMember).filter(FamilyMember.user_id == current_user.id)
+    families = paginate(query, Family, response, cursor=cursor, skip=skip, limit=limit)
+    return response_cache.put(cache_key, List[FamilySchema], families, response, ttl=read_cache_ttl(db))
 
 
 @router.post("", response_model=FamilySchema)
+@sql_budget(7)
 def create_family(
     family_data: FamilyCreate,
     current_user: User = Depends(get_current_active_user),
@@ -55,23 +82,16 @@ def create_family(
 
 
 @router.get("/{family_id}", response_model=FamilySchema)
+@sql_budget(4)
 def get_family(
     family_id: UUID,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    member: Membership = Depends(get_family_membership),
+    db: Session = Depends(get_read_db)
 ):
     """获取家庭详情"""
-    # 检查用户是否是家庭成员
-    member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == family_id,
-        FamilyMember.user_id == current_user.id
-    ).first()
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this family"
-        )
-    
+    check_family_etag(db, family_id, request, response)
     family = db.query(Family).filter(Family.id == family_id).first()
     if not family:
         raise HTTPException(
@@ -83,25 +103,14 @@ def get_family(
 
 
 @router.put("/{family_id}", response_model=FamilySchema)
+@sql_budget(7)
 def update_family(
     family_id: UUID,
     family_data: FamilyUpdate,
-    current_user: User = Depends(get_current_active_user),
+    member: Membership = Depends(get_family_admin),
     db: Session = Depends(get_db)
 ):
     """更新家庭信息"""
-    # 检查用户是否是家庭管理员
-    member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == family_id,
-        FamilyMember.user_id == current_user.id,
-        FamilyMember.role == "admin"
-    ).first()
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not an admin of this family"
-        )
-    
     family = db.query(Family).filter(Family.id == family_id).first()
     if not family:
         raise HTTPException(
@@ -115,7 +124,7 @@ def update_family(
     if family_data.avatar_key is not None:
         family.avatar_key = family_data.avatar_key
     
-    db.commit()
+    commit_and_bump_version(db, family_id)
     db.refresh(family)
     
     return family
@@ -144,11 +153,13 @@ def delete_family(
     
     db.delete(family)
     db.commit()
+    invalidate_membership(family_id)
     
     return {"message": "Family deleted successfully"}
 
 
 @router.post("/{family_id}/join")
+@sql_budget(6)
 def join_family(
     family_id: UUID,
     current_user: User = Depends(get_current_active_user),
@@ -164,11 +175,7 @@ def join_family(
         )
     
     # 检查用户是否已经是家庭成员
-    existing_member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == family_id,
-        FamilyMember.user_id == current_user.id
-    ).first()
-    if existing_member:
+    if get_membership(db, family_id, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You are already a member of this family"
@@ -181,59 +188,44 @@ def join_family(
         role="member"
     )
     db.add(member)
-    db.commit()
+    commit_and_bump_version(db, family_id)
+    invalidate_membership(family_id, current_user.id)
     
     return {"message": "Joined family successfully"}
 
 
 @router.get("/{family_id}/members", response_model=List[FamilyMemberSchema])
+@sql_budget(4)
 def get_family_members(
     family_id: UUID,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    member: Membership = Depends(get_family_membership),
+    db: Session = Depends(get_read_db)
 ):
     """获取家庭成员列表"""
-    # 检查用户是否是家庭成员
-    member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == family_id,
-        FamilyMember.user_id == current_user.id
-    ).first()
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this family"
-        )
+    # 剩余额度按月重置，月份也是 ETag 和缓存键的一部分
+    month = current_month()
+    version = check_family_etag(db, family_id, request, response, extra=[month])
+    cache_key = response_cache.key(f"members:{month}", family_scope(family_id), version, member.role, request)
+    cached = response_cache.get(cache_key, response)
+    if cached is not None:
+        return cached
     
     members = db.query(FamilyMember).filter(FamilyMember.family_id == family_id).all()
-    return members
+    return response_cache.put(cache_key, List[FamilyMemberSchema], _with_remaining_quota(db, members), response, ttl=read_cache_ttl(db))
 
 
 @router.post("/{family_id}/members", response_model=FamilyMemberSchema)
 def add_family_member(
     family_id: UUID,
     member_data: FamilyMemberCreate,
-    current_user: User = Depends(get_current_active_user),
+    admin_member: Membership = Depends(get_family_admin),
     db: Session = Depends(get_db)
 ):
     """添加家庭成员"""
-    # 检查用户是否是家庭管理员
-    admin_member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == family_id,
-        FamilyMember.user_id == current_user.id,
-        FamilyMember.role == "admin"
-    ).first()
-    if not admin_member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not an admin of this family"
-        )
-    
     # 检查用户是否已经是家庭成员
-    existing_member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == family_id,
-        FamilyMember.user_id == member_data.user_id
-    ).first()
-    if existing_member:
+    if get_membership(db, family_id, member_data.user_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User is already a member of this family"
@@ -247,32 +239,21 @@ def add_family_member(
         monthly_quota=member_data.monthly_quota
     )
     db.add(member)
-    db.commit()
+    commit_and_bump_version(db, family_id)
     db.refresh(member)
+    invalidate_membership(family_id, member_data.user_id)
     
-    return member
+    return _with_remaining_quota(db, [member])[0]
 
 
 @router.delete("/{family_id}/members/{member_id}")
 def remove_family_member(
     family_id: UUID,
     member_id: UUID,
-    current_user: User = Depends(get_current_active_user),
+    admin_member: Membership = Depends(get_family_admin),
     db: Session = Depends(get_db)
 ):
     """移除家庭成员"""
-    # 检查用户是否是家庭管理员
-    admin_member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == family_id,
-        FamilyMember.user_id == current_user.id,
-        FamilyMember.role == "admin"
-    ).first()
-    if not admin_member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not an admin of this family"
-        )
-    
     # 检查成员是否存在
     member = db.query(FamilyMember).filter(
         FamilyMember.id == member_id,
@@ -292,7 +273,9 @@ def remove_family_member(
             detail="Cannot remove the family creator"
         )
     
+    user_id = member.user_id
     db.delete(member)
-    db.commit()
+    commit_and_bump_version(db, family_id)
+    invalidate_membership(family_id, user_id)
     
     return {"message": "Member removed successfully"}
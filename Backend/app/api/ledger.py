@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, File, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from uuid import UUID
+from datetime import datetime, timezone
+from typing import Optional, Literal
+import io
+
+from app.core.database import get_db
+from app.core.etag import check_family_etag
+from app.core.dependencies import get_current_active_user, get_family_admin, get_family_membership, get_read_db
+from app.core.membership import Membership
+from app.models.user import User
+from app.schemas.ledger import FamilyReplayReport, FamilyBalances
+from app.schemas.transaction import TransactionImportResult
+from app.services.checkpoints import balances_as_of
+from app.services.export import MEDIA_TYPES, accepts_gzip, gzip_stream, stream_transactions
+from app.services.importer import import_transactions
+from app.services.replay import replay_family
+
+router = APIRouter()
+
+
+@router.post("/{family_id}/balances/verify", response_model=FamilyReplayReport)
+def verify_balances(
+    family_id: UUID,
+    repair: bool = False,
+    membership: Membership = Depends(get_family_admin),
+    db: Session = Depends(get_db)
+):
+    """由交易事件重放校验家庭成员余额快照（仅管理员），repair=true 时修复不一致的快照"""
+    return replay_family(db, family_id, repair=repair)
+
+
+@router.get("/{family_id}/balances", response_model=FamilyBalances)
+def get_balances(
+    family_id: UUID,
+    request: Request,
+    response: Response,
+    as_of: Optional[datetime] = None,
+    membership: Membership = Depends(get_family_membership),
+    db: Session = Depends(get_read_db)
+):
+    """获取家庭成员在 as_of 时刻的余额（默认当前时刻），由最近的检查点加之后的事件计算"""
+    check_family_etag(db, family_id, request, response)
+    return balances_as_of(db, family_id, as_of or datetime.now(timezone.utc))
+
+
+@router.get("/{family_id}/transactions/export")
+def export_transactions(
+    family_id: UUID,
+    request: Request,
+    fmt: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    membership: Membership = Depends(get_family_membership)
+):
+    """流式导出家庭的全部交易记录（CSV 或 NDJSON），客户端支持时以 gzip 压缩传输"""
+    body = stream_transactions(family_id, fmt)
+    headers = {
+        "Content-Disposition": f'attachment; filename="transactions-{family_id}.{fmt}"',
+        "Vary": "Accept-Encoding",
+    }
+    if accepts_gzip(request.headers.get("accept-encoding", "")):
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
+@router.post("/{family_id}/transactions/import", response_model=TransactionImportResult)
+def import_transactions_csv(
+    family_id: UUID,
+    file: UploadFile = File(...),
+    membership: Membership = Depends(get_family_admin),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """从 CSV 批量导入历史交易（仅管理员），任一行有误时不导入并返回错误行"""
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        return import_transactions(db, family_id, current_user.id, lines)
+    finally:
+        lines.detach()
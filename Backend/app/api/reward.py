@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
 from app.core.database import get_db
@@ -8,44 +8,46 @@ from app.models.user import User
 from app.models.family import FamilyMember
 from app.models.reward import Reward
 from app.schemas.reward import Reward as RewardSchema, RewardCreate, RewardUpdate
-from app.core.dependencies import get_current_active_user
+from app.core.dependencies import get_current_active_user, get_read_db
+from app.core.membership import require_member
+from app.core.pagination import MAX_PAGE_SIZE, paginate
+from app.core.etag import check_family_etag, commit_and_bump_version
+from app.core.sql_budget import sql_budget
 
 router = APIRouter()
 
 
 @router.get("", response_model=List[RewardSchema])
+@sql_budget(4)
 def get_rewards(
+    request: Request,
+    response: Response,
     family_id: UUID = None,
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取奖励列表"""
     query = db.query(Reward)
     
     if family_id:
         # 检查用户是否是家庭成员
-        member = db.query(FamilyMember).filter(
-            FamilyMember.family_id == family_id,
-            FamilyMember.user_id == current_user.id
-        ).first()
-        if not member:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You are not a member of this family"
-            )
+        member = require_member(db, family_id, current_user.id)
+        check_family_etag(db, family_id, request, response)
         query = query.filter(Reward.family_id == family_id)
     else:
         # 获取用户参与的所有奖励
         member_ids = [m.id for m in db.query(FamilyMember).filter(FamilyMember.user_id == current_user.id).all()]
         query = query.filter(Reward.member_id.in_(member_ids))
     
-    rewards = query.offset(skip).limit(limit).all()
+    rewards = paginate(query, Reward, response, cursor=cursor, skip=skip, limit=limit)
     return rewards
 
 
 @router.post("", response_model=RewardSchema)
+@sql_budget(6)
 def create_reward(
     reward_data: RewardCreate,
     current_user: User = Depends(get_current_active_user),
@@ -53,15 +55,7 @@ def create_reward(
 ):
     """创建奖励申请"""
     # 检查用户是否是家庭成员
-    member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == reward_data.family_id,
-        FamilyMember.user_id == current_user.id
-    ).first()
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this family"
-        )
+    member = require_member(db, reward_data.family_id, current_user.id)
     
     # 检查申请人是否是家庭成员
     applicant = db.query(FamilyMember).filter(
@@ -82,7 +76,7 @@ def create_reward(
         reason=reward_data.reason
     )
     db.add(reward)
-    db.commit()
+    commit_and_bump_version(db, reward_data.family_id)
     db.refresh(reward)
     
     return reward
@@ -91,8 +85,10 @@ def create_reward(
 @router.get("/{reward_id}", response_model=RewardSchema)
 def get_reward(
     reward_id: UUID,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取奖励详情"""
     reward = db.query(Reward).filter(Reward.id == reward_id).first()
@@ -103,15 +99,8 @@ def get_reward(
         )
     
     # 检查用户是否是家庭成员
-    member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == reward.family_id,
-        FamilyMember.user_id == current_user.id
-    ).first()
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this family"
-        )
+    member = require_member(db, reward.family_id, current_user.id)
+    check_family_etag(db, reward.family_id, request, response)
     
     return reward
 
@@ -132,15 +121,7 @@ def update_reward(
         )
     
     # 检查用户是否是家庭成员
-    member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == reward.family_id,
-        FamilyMember.user_id == current_user.id
-    ).first()
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this family"
-        )
+    member = require_member(db, reward.family_id, current_user.id)
     
     # 只有管理员可以审批奖励
     if member.role != "admin":
@@ -152,7 +133,7 @@ def update_reward(
     # 更新奖励状态
     reward.status = reward_data.status
     
-    db.commit()
+    commit_and_bump_version(db, reward.family_id)
     db.refresh(reward)
     
     return reward
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
 from app.core.database import get_db
@@ -8,44 +8,54 @@ from app.models.user import User
 from app.models.family import FamilyMember
 from app.models.service import Service
 from app.schemas.service import Service as ServiceSchema, ServiceCreate, ServiceUpdate
-from app.core.dependencies import get_current_active_user
+from app.core.dependencies import get_current_active_user, get_read_db
+from app.core.membership import require_member
+from app.core.pagination import MAX_PAGE_SIZE, paginate
+from app.core.etag import check_family_etag, commit_and_bump_version
+from app.core.replicas import read_cache_ttl
+from app.core.response_cache import response_cache, family_scope
+from app.core.sql_budget import sql_budget
 
 router = APIRouter()
 
 
 @router.get("", response_model=List[ServiceSchema])
+@sql_budget(4)
 def get_services(
+    request: Request,
+    response: Response,
     family_id: UUID = None,
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取服务列表"""
     query = db.query(Service).filter(Service.status == "active")
     
     if family_id:
         # 检查用户是否是家庭成员
-        member = db.query(FamilyMember).filter(
-            FamilyMember.family_id == family_id,
-            FamilyMember.user_id == current_user.id
-        ).first()
-        if not member:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You are not a member of this family"
-            )
+        member = require_member(db, family_id, current_user.id)
+        version = check_family_etag(db, family_id, request, response)
+        cache_key = response_cache.key("services", family_scope(family_id), version, member.role, request)
+        cached = response_cache.get(cache_key, response)
+        if cached is not None:
+            return cached
         query = query.filter(Service.family_id == family_id)
     else:
         # 获取用户参与的所有服务
         member_ids = [m.id for m in db.query(FamilyMember).filter(FamilyMember.user_id == current_user.id).all()]
         query = query.filter(Service.provider_id.in_(member_ids))
     
-    services = query.offset(skip).limit(limit).all()
+    services = paginate(query, Service, response, cursor=cursor, skip=skip, limit=limit)
+    if family_id:
+        return response_cache.put(cache_key, List[ServiceSchema], services, response, ttl=read_cache_ttl(db))
     return services
 
 
 @router.post("", response_model=ServiceSchema)
+@sql_budget(6)
 def create_service(
     service_data: ServiceCreate,
     current_user: User = Depends(get_current_active_user),
@@ -53,15 +63,7 @@ def create_service(
 ):
     """创建服务"""
     # 检查用户是否是家庭成员
-    member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == service_data.family_id,
-        FamilyMember.user_id == current_user.id
-    ).first()
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this family"
-        )
+    member = require_member(db, service_data.family_id, current_user.id)
     
     # 检查提供者是否是家庭成员
     provider = db.query(FamilyMember).filter(
@@ -82,17 +84,20 @@ def create_service(
         provider_id=service_data.provider_id
     )
     db.add(service)
-    db.commit()
+    commit_and_bump_version(db, service_data.family_id)
     db.refresh(service)
     
     return service
 
 
 @router.get("/{service_id}", response_model=ServiceSchema)
+@sql_budget(4)
 def get_service(
     service_id: UUID,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取服务详情"""
     service = db.query(Service).filter(Service.id == service_id).first()
@@ -103,20 +108,14 @@ def get_service(
         )
     
     # 检查用户是否是家庭成员
-    member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == service.family_id,
-        FamilyMember.user_id == current_user.id
-    ).first()
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this family"
-        )
+    member = require_member(db, service.family_id, current_user.id)
+    check_family_etag(db, service.family_id, request, response)
     
     return service
 
 
 @router.put("/{service_id}", response_model=ServiceSchema)
+@sql_budget(7)
 def update_service(
     service_id: UUID,
     service_data: ServiceUpdate,
@@ -132,19 +131,10 @@ def update_service(
         )
     
     # 检查用户是否是家庭成员
-    member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == service.family_id,
-        FamilyMember.user_id == current_user.id
-    ).first()
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this family"
-        )
+    member = require_member(db, service.family_id, current_user.id)
     
-    # 只有提供者或管理员可以更新服务
-    provider = db.query(FamilyMember).filter(FamilyMember.id == service.provider_id).first()
-    if provider.user_id != current_user.id and member.role != "admin":
+    # 只有提供者或管理员可以更新服务；成员ID属于唯一的家庭和用户，直接与当前成员身份比较
+    if service.provider_id != member.id and member.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only the provider or admin can update the service"
@@ -158,13 +148,14 @@ def update_service(
     if service_data.status is not None:
         service.status = service_data.status
     
-    db.commit()
+    commit_and_bump_version(db, service.family_id)
     db.refresh(service)
     
     return service
 
 
 @router.delete("/{service_id}")
+@sql_budget(5)
 def delete_service(
     service_id: UUID,
     current_user: User = Depends(get_current_active_user),
@@ -179,25 +170,17 @@ def delete_service(
         )
     
     # 检查用户是否是家庭成员
-    member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == service.family_id,
-        FamilyMember.user_id == current_user.id
-    ).first()
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this family"
-        )
+    member = require_member(db, service.family_id, current_user.id)
     
-    # 只有提供者或管理员可以删除服务
-    provider = db.query(FamilyMember).filter(FamilyMember.id == service.provider_id).first()
-    if provider.user_id != current_user.id and member.role != "admin":
+    # 只有提供者或管理员可以删除服务；成员ID属于唯一的家庭和用户，直接与当前成员身份比较
+    if service.provider_id != member.id and member.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only the provider or admin can delete the service"
         )
     
+    family_id = service.family_id
     db.delete(service)
-    db.commit()
+    commit_and_bump_version(db, family_id)
     
     return {"message": "Service deleted successfully"}
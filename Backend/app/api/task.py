@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
 from app.core.database import get_db
@@ -8,33 +8,40 @@ from app.models.user import User
 from app.models.family import FamilyMember
 from app.models.task import BountyTask
 from app.schemas.task import BountyTask as BountyTaskSchema, BountyTaskCreate, BountyTaskUpdate
-from app.core.dependencies import get_current_active_user
+from app.core.dependencies import get_current_active_user, get_read_db
+from app.core.membership import require_member
+from app.core.pagination import MAX_PAGE_SIZE, paginate
+from app.core.etag import check_family_etag, commit_and_bump_version
+from app.core.replicas import read_cache_ttl
+from app.core.response_cache import response_cache, family_scope
+from app.core.sql_budget import sql_budget
 
 router = APIRouter()
 
 
 @router.get("", response_model=List[BountyTaskSchema])
+@sql_budget(4)
 def get_tasks(
+    request: Request,
+    response: Response,
     family_id: UUID = None,
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取任务列表"""
     query = db.query(BountyTask)
     
     if family_id:
         # 检查用户是否是家庭成员
-        member = db.query(FamilyMember).filter(
-            FamilyMember.family_id == family_id,
-            FamilyMember.user_id == current_user.id
-        ).first()
-        if not member:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You are not a member of this family"
-            )
+        member = require_member(db, family_id, current_user.id)
+        version = check_family_etag(db, family_id, request, response)
+        cache_key = response_cache.key("tasks", family_scope(family_id), version, member.role, request)
+        cached = response_cache.get(cache_key, response)
+        if cached is not None:
+            return cached
         query = query.filter(BountyTask.family_id == family_id)
     else:
         # 获取用户参与的所有任务
@@ -43,11 +50,14 @@ def get_tasks(
             (BountyTask.created_by.in_(member_ids)) | (BountyTask.assigned_to.in_(member_ids))
         )
     
-    tasks = query.offset(skip).limit(limit).all()
+    tasks = paginate(query, BountyTask, response, cursor=cursor, skip=skip, limit=limit)
+    if family_id:
+        return response_cache.put(cache_key, List[BountyTaskSchema], tasks, response, ttl=read_cache_ttl(db))
     return tasks
 
 
 @router.post("", response_model=BountyTaskSchema)
+@sql_budget(7)
 def create_task(
     task_data: BountyTaskCreate,
     current_user: User = Depends(get_current_active_user),
@@ -55,15 +65,7 @@ def create_task(
 ):
     """创建任务"""
     # 检查用户是否是家庭成员
-    member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == task_data.family_id,
-        FamilyMember.user_id == current_user.id
-    ).first()
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this family"
-        )
+    member = require_member(db, task_data.family_id, current_user.id)
     
     # 检查创建者是否是家庭成员
     creator = db.query(FamilyMember).filter(
@@ -97,17 +99,20 @@ def create_task(
         assigned_to=task_data.assigned_to
     )
     db.add(task)
-    db.commit()
+    commit_and_bump_version(db, task_data.family_id)
     db.refresh(task)
     
     return task
 
 
 @router.get("/{task_id}", response_model=BountyTaskSchema)
+@sql_budget(4)
 def get_task(
     task_id: UUID,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取任务详情"""
     task = db.query(BountyTask).filter(BountyTask.id == task_id).first()
@@ -118,20 +123,14 @@ def get_task(
         )
     
     # 检查用户是否是家庭成员
-    member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == task.family_id,
-        FamilyMember.user_id == current_user.id
-    ).first()
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this family"
-        )
+    member = require_member(db, task.family_id, current_user.id)
+    check_family_etag(db, task.family_id, request, response)
     
     return task
 
 
 @router.put("/{task_id}", response_model=BountyTaskSchema)
+@sql_budget(8)
 def update_task(
     task_id: UUID,
     task_data: BountyTaskUpdate,
@@ -147,15 +146,7 @@ def update_task(
         )
     
     # 检查用户是否是家庭成员
-    member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == task.family_id,
-        FamilyMember.user_id == current_user.id
-    ).first()
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this family"
-        )
+    member = require_member(db, task.family_id, current_user.id)
     
     # 更新任务信息
     if task_data.title is not None:
@@ -177,13 +168,14 @@ def update_task(
     if task_data.status is not None:
         task.status = task_data.status
     
-    db.commit()
+    commit_and_bump_version(db, task.family_id)
     db.refresh(task)
     
     return task
 
 
 @router.delete("/{task_id}")
+@sql_budget(5)
 def delete_task(
     task_id: UUID,
     current_user: User = Depends(get_current_active_user),
@@ -198,27 +190,17 @@ def delete_task(
         )
     
     # 检查用户是否是家庭成员
-    member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == task.family_id,
-        FamilyMember.user_id == current_user.id
-    ).first()
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this family"
-        )
+    member = require_member(db, task.family_id, current_user.id)
     
-    # 只有创建者或管理员可以删除任务
-    creator_member = db.query(FamilyMember).filter(
-        FamilyMember.id == task.created_by
-    ).first()
-    if creator_member.user_id != current_user.id and member.role != "admin":
+    # 只有创建者或管理员可以删除任务；成员ID属于唯一的家庭和用户，直接与当前成员身份比较
+    if task.created_by != member.id and member.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only the creator or admin can delete the task"
         )
     
+    family_id = task.family_id
     db.delete(task)
-    db.commit()
+    commit_and_bump_version(db, family_id)
     
     return {"message": "Task deleted successfully"}
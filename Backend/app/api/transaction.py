@@ -1,164 +1,135 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from uuid import UUID
-from sqlalchemy import and_, or_
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, get_async_db
 from app.models.user import User
-from app.models.family import FamilyMember
-from app.models.transaction import TransactionEvent, MemberBalanceSnapshot
-from app.schemas.transaction import TransactionEvent as TransactionEventSchema, TransactionEventCreate
-from app.core.dependencies import get_current_active_user
+from app.schemas.transaction import (
+    TransactionEvent as TransactionEventSchema, TransactionEventCreate,
+    TransactionBatchCreate, TransactionBatchResult
+)
+from app.core.dependencies import (
+    get_async_read_db, get_current_active_user, get_current_active_user_async, get_read_db
+)
+from app.core.pagination import MAX_PAGE_SIZE
+from app.core.sql_budget import sql_budget
+from app.services import transactions as transaction_service
+from app.services.idempotency import IDEMPOTENCY_KEY_HEADER
 
 router = APIRouter()
 
+# 语句预算按缓存未命中、携带 Idempotency-Key 的情况计算；批量接口的语句数与条数无关
+if settings.database_async:
+    # 异步模式：路由运行在事件循环上，业务逻辑通过 run_sync 在 asyncpg 连接上执行
+    from sqlalchemy.ext.asyncio import AsyncSession
 
-def update_balance_snapshot(db: Session, member_id: UUID, amount: float):
-    """更新余额快照"""
-    snapshot = db.query(MemberBalanceSnapshot).filter(MemberBalanceSnapshot.member_id == member_id).first()
-    if not snapshot:
-        # 创建新的快照
-        snapshot = MemberBalanceSnapshot(
-            member_id=member_id,
-            balance=amount
+    @router.get("", response_model=List[TransactionEventSchema])
+    @sql_budget(4)
+    async def get_transactions(
+        request: Request,
+        response: Response,
+        family_id: UUID = None,
+        cursor: Optional[str] = None,
+        skip: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+        current_user: User = Depends(get_current_active_user_async),
+        db: AsyncSession = Depends(get_async_read_db)
+    ):
+        """获取交易记录"""
+        return await db.run_sync(
+            transaction_service.list_transactions, current_user.id, request, response, family_id, cursor, skip, limit
         )
-        db.add(snapshot)
-    else:
-        # 更新现有快照
-        snapshot.balance += amount
-    return snapshot
 
+    @router.post("", response_model=TransactionEventSchema)
+    @sql_budget(9)
+    async def create_transaction(
+        transaction_data: TransactionEventCreate,
+        response: Response,
+        idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_KEY_HEADER, max_length=255),
+        current_user: User = Depends(get_current_active_user_async),
+        db: AsyncSession = Depends(get_async_db)
+    ):
+        """创建交易记录"""
+        return await db.run_sync(
+            transaction_service.create_transaction, current_user.id, transaction_data, idempotency_key, response
+        )
 
-@router.get("", response_model=List[TransactionEventSchema])
-def get_transactions(
-    family_id: UUID = None,
-    skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
-):
-    """获取交易记录"""
-    query = db.query(TransactionEvent)
-    
-    if family_id:
-        # 检查用户是否是家庭成员
-        member = db.query(FamilyMember).filter(
-            FamilyMember.family_id == family_id,
-            FamilyMember.user_id == current_user.id
-        ).first()
-        if not member:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You are not a member of this family"
-            )
-        query = query.filter(TransactionEvent.family_id == family_id)
-    else:
-        # 获取用户参与的所有交易
-        member_ids = [m.id for m in db.query(FamilyMember).filter(FamilyMember.user_id == current_user.id).all()]
-        query = query.filter(
-            or_(
-                TransactionEvent.from_member_id.in_(member_ids),
-                TransactionEvent.to_member_id.in_(member_ids)
-            )
+    @router.post("/batch", response_model=TransactionBatchResult)
+    @sql_budget(11)
+    async def create_transactions_batch(
+        batch_data: TransactionBatchCreate,
+        response: Response,
+        idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_KEY_HEADER, max_length=255),
+        current_user: User = Depends(get_current_active_user_async),
+        db: AsyncSession = Depends(get_async_db)
+    ):
+        """批量创建交易记录"""
+        return await db.run_sync(
+            transaction_service.create_transactions_batch, current_user.id, batch_data, idempotency_key, response
         )
-    
-    transactions = query.offset(skip).limit(limit).all()
-    return transactions
 
+    @router.get("/{transaction_id}", response_model=TransactionEventSchema)
+    @sql_budget(4)
+    async def get_transaction(
+        transaction_id: UUID,
+        request: Request,
+        response: Response,
+        current_user: User = Depends(get_current_active_user_async),
+        db: AsyncSession = Depends(get_async_read_db)
+    ):
+        """获取交易详情"""
+        return await db.run_sync(transaction_service.get_transaction, current_user.id, request, response, transaction_id)
 
-@router.post("", response_model=TransactionEventSchema)
-def create_transaction(
-    transaction_data: TransactionEventCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
-):
-    """创建交易记录"""
-    # 检查用户是否是家庭成员
-    member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == transaction_data.family_id,
-        FamilyMember.user_id == current_user.id
-    ).first()
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this family"
-        )
-    
-    # 检查付款方余额（如果有）
-    if transaction_data.from_member_id:
-        from_member = db.query(FamilyMember).filter(FamilyMember.id == transaction_data.from_member_id).first()
-        if not from_member:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="From member not found"
-            )
-        
-        # 检查余额
-        snapshot = db.query(MemberBalanceSnapshot).filter(MemberBalanceSnapshot.member_id == from_member.id).first()
-        if snapshot and snapshot.balance < transaction_data.amount:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Insufficient balance"
-            )
-    
-    # 检查收款方
-    if transaction_data.to_member_id:
-        to_member = db.query(FamilyMember).filter(FamilyMember.id == transaction_data.to_member_id).first()
-        if not to_member:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="To member not found"
-            )
-    
-    # 创建交易事件
-    transaction = TransactionEvent(
-        family_id=transaction_data.family_id,
-        event_type=transaction_data.event_type,
-        amount=transaction_data.amount,
-        from_member_id=transaction_data.from_member_id,
-        to_member_id=transaction_data.to_member_id,
-        reference_id=transaction_data.reference_id,
-        description=transaction_data.description,
-        created_by=current_user.id
-    )
-    db.add(transaction)
-    
-    # 更新余额快照
-    if transaction_data.from_member_id:
-        update_balance_snapshot(db, transaction_data.from_member_id, -transaction_data.amount)
-    if transaction_data.to_member_id:
-        update_balance_snapshot(db, transaction_data.to_member_id, transaction_data.amount)
-    
-    db.commit()
-    db.refresh(transaction)
-    
-    return transaction
+else:
+    @router.get("", response_model=List[TransactionEventSchema])
+    @sql_budget(4)
+    def get_transactions(
+        request: Request,
+        response: Response,
+        family_id: UUID = None,
+        cursor: Optional[str] = None,
+        skip: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+        current_user: User = Depends(get_current_active_user),
+        db: Session = Depends(get_read_db)
+    ):
+        """获取交易记录"""
+        return transaction_service.list_transactions(db, current_user.id, request, response, family_id, cursor, skip, limit)
 
+    @router.post("", response_model=TransactionEventSchema)
+    @sql_budget(9)
+    def create_transaction(
+        transaction_data: TransactionEventCreate,
+        response: Response,
+        idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_KEY_HEADER, max_length=255),
+        current_user: User = Depends(get_current_active_user),
+        db: Session = Depends(get_db)
+    ):
+        """创建交易记录"""
+        return transaction_service.create_transaction(db, current_user.id, transaction_data, idempotency_key, response)
 
-@router.get("/{transaction_id}", response_model=TransactionEventSchema)
-def get_transaction(
-    transaction_id: UUID,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
-):
-    """获取交易详情"""
-    transaction = db.query(TransactionEvent).filter(TransactionEvent.id == transaction_id).first()
-    if not transaction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Transaction not found"
-        )
-    
-    # 检查用户是否是家庭成员
-    member = db.query(FamilyMember).filter(
-        FamilyMember.family_id == transaction.family_id,
-        FamilyMember.user_id == current_user.id
-    ).first()
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this family"
-        )
-    
-    return transaction
+    @router.post("/batch", response_model=TransactionBatchResult)
+    @sql_budget(11)
+    def create_transactions_batch(
+        batch_data: TransactionBatchCreate,
+        response: Response,
+        idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_KEY_HEADER, max_length=255),
+        current_user: User = Depends(get_current_active_user),
+        db: Session = Depends(get_db)
+    ):
+        """批量创建交易记录"""
+        return transaction_service.create_transactions_batch(db, current_user.id, batch_data, idempotency_key, response)
+
+    @router.get("/{transaction_id}", response_model=TransactionEventSchema)
+    @sql_budget(4)
+    def get_transaction(
+        transaction_id: UUID,
+        request: Request,
+        response: Response,
+        current_user: User = Depends(get_current_active_user),
+        db: Session = Depends(get_read_db)
+    ):
+        """获取交易详情"""
+        return transaction_service.get_transaction(db, current_user.id, request, response, transaction_id)
@@ -1,16 +1,37 @@
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
+import hashlib
+import hmac
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
+from app.core.cache import MISSING, TTLCache
 from app.core.config import settings
 
-# 密码加密上下文
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 密码加密上下文，低于配置代价的哈希在登录时升级
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.password_bcrypt_rounds,
+    bcrypt__min_rounds=settings.password_bcrypt_rounds
+)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """验证密码"""
+def _is_legacy_hash(hashed_password: str) -> bool:
+    """早期版本使用的无盐 SHA-256 十六进制摘要"""
+    return len(hashed_password) == 64 and all(c in "0123456789abcdef" for c in hashed_password)
+
+
+def verify_password(plain_password: str, hashed_password: Optional[str]) -> bool:
+    """验证密码，兼容旧的 SHA-256 哈希"""
+    if not hashed_password:
+        return False
+    if _is_legacy_hash(hashed_password):
+        legacy = hashlib.sha256(plain_password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, hashed_password)
     return pwd_context.verify(plain_password, hashed_password)
 
 
@@ -19,6 +40,46 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """旧的 SHA-256 哈希或代价参数低于当前配置时需要重新哈希"""
+    return _is_legacy_hash(hashed_password) or pwd_context.needs_update(hashed_password)
+
+
+# bcrypt 是 CPU 密集型计算，放到独立进程池中执行，避免占用事件循环和路由线程池；
+# 信号量限制同时提交的任务数，突发登录请求在事件循环上排队等待，不影响其他接口
+_hash_executor: Optional[ProcessPoolExecutor] = None
+_hash_semaphore: Optional[asyncio.Semaphore] = None
+
+
+async def _run_in_hash_pool(func, *args):
+    global _hash_executor, _hash_semaphore
+    if _hash_executor is None:
+        _hash_executor = ProcessPoolExecutor(max_workers=settings.password_hash_workers)
+        _hash_semaphore = asyncio.Semaphore(settings.password_hash_concurrency)
+    async with _hash_semaphore:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+
+
+async def hash_password_async(password: str) -> str:
+    """在进程池中计算密码哈希"""
+    return await _run_in_hash_pool(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: Optional[str]) -> bool:
+    """在进程池中验证密码；旧的 SHA-256 哈希计算量很小，直接在当前线程验证"""
+    if not hashed_password or _is_legacy_hash(hashed_password):
+        return verify_password(plain_password, hashed_password)
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+def shutdown_password_hasher() -> None:
+    """关闭密码哈希进程池"""
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """创建访问令牌"""
     to_encode = data.copy()
@@ -38,3 +99,28 @@ def decode_access_token(token: str) -> Optional[dict]:
         return payload
     except JWTError:
         return None
+
+
+# 已验证令牌缓存：sha256(token) -> user_id，条目在令牌过期时失效
+_token_cache = TTLCache(
+    "auth_token",
+    maxsize=settings.auth_token_cache_size,
+    ttl=settings.access_token_expire_minutes * 60
+)
+
+
+def verify_access_token(token: str) -> Optional[str]:
+    """验证访问令牌并返回用户ID，命中缓存时跳过签名校验"""
+    key = hashlib.sha256(token.encode()).digest()
+    user_id = _token_cache.get(key)
+    if user_id is not MISSING:
+        return user_id
+    
+    payload = decode_access_token(token)
+    if not payload or payload.get("sub") is None:
+        return None
+    user_id = payload["sub"]
+    ttl = payload.get("exp", 0) - time.time()
+    if ttl > 0:
+        _token_cache.set(key, user_id, ttl=ttl)
+    return user_id
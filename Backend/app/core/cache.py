@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# 进程内所有缓存，按名称登记，用于统计命中率
+_registry: Dict[str, Any] = {}
+
+MISSING = object()
+
+
+class TTLCache:
+    """线程安全的进程内 LRU 缓存，条目在 ttl 秒后过期
+
+    同步路由运行在线程池中，所有操作都在锁内完成。
+    多进程部署时每个进程各有一份缓存，写操作只能失效本进程的条目，
+    因此 ttl 决定了其他进程最多读到多久之前的数据。
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 60):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """读取缓存，未命中或已过期时返回 default"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] <= now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """删除单个条目"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def pop_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """删除所有 key 满足条件的条目"""
+        with self._lock:
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """命中统计"""
+        with self._lock:
+            size = len(self._data)
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "size": size,
+            "maxsize": self.maxsize,
+        }
+
+
+def register_stats(name: str, cache: Any) -> None:
+    """登记其他提供 stats() 方法的缓存，一并出现在统计信息中"""
+    _registry[name] = cache
+
+
+def cache_stats() -> Dict[str, dict]:
+    """所有已登记缓存的统计信息"""
+    return {name: cache.stats() for name, cache in _registry.items()}
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -10,18 +10,107 @@ class Settings(BaseSettings):
     
     # 数据库配置
     database_url: str
+    # 异步模式：交易接口以 async def 运行在 asyncpg 上；未设置 database_async_url 时由 database_url 推导
+    database_async: bool = False
+    database_async_url: Optional[str] = None
+    # 每个进程的连接池大小，同步、异步引擎各自一份
+    database_pool_size: int = 10
+    database_max_overflow: int = 20
+    # 所有工作进程合计的连接上限（应低于 PostgreSQL 的 max_connections 减去预留连接），
+    # 设置后每个进程的连接池按 web_concurrency 均分；web_concurrency 由 gunicorn_conf.py 设置。
+    # 配置了只读副本时，该上限分别作用于主库和每个副本
+    database_max_connections: Optional[int] = None
+    web_concurrency: int = 1
+    # 均分连接上限时额外预留的进程数：按 max_requests 回收的工作进程在 graceful_timeout 内
+    # 排空请求时，与替换它的新进程同时持有连接
+    database_spare_workers: int = 1
+    # 只读副本的连接字符串，逗号分隔；GET 接口经 get_read_db 读取副本
+    database_read_urls: str = ""
+    # 用户提交写入后该时间（秒）内，其读请求仍走主库，应大于副本的复制延迟
+    database_read_sticky_seconds: float = 5
+    # 副本连接失败后暂停使用的时间（秒），期间读请求由其他副本或主库处理
+    database_replica_retry_seconds: float = 30
+    database_replica_connect_timeout: int = 2
     
     # JWT配置
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     
+    # 密码哈希：bcrypt 代价、进程池大小与同时计算的哈希数上限
+    password_bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_concurrency: int = 4
+    
+    # 认证缓存：已验证令牌缓存到过期为止；用户行缓存（秒），修改用户信息时失效
+    auth_token_cache_size: int = 10000
+    auth_user_cache_ttl: int = 60
+    auth_user_cache_size: int = 10000
+    
+    # 列表响应缓存：auto（配置了 redis_url 时用 redis，否则 memory）、memory（进程内）、
+    # redis（多进程共享，需要 redis_url）或 none
+    response_cache_backend: str = "auto"
+    response_cache_ttl: int = 60
+    response_cache_size: int = 2000
+    response_cache_max_entry_bytes: int = 256 * 1024
+    redis_url: Optional[str] = None
+    
+    # 月度额度按该时区的自然月统计
+    quota_timezone: str = "Asia/Shanghai"
+    
     # 文件存储配置
     upload_dir: str = "./uploads"
+    # 头像文件大小上限（字节），超出时返回 413
+    avatar_max_bytes: int = 5 * 1024 * 1024
+    # 生成头像变体的进程数
+    avatar_workers: int = 2
+    # 返回给客户端的文件地址前缀
+    public_base_url: str = "http://127.0.0.1:8000"
+    
+    # 日志：根级别、分模块级别（如 "app.api.auth=DEBUG,homeledger.sql=WARNING"）、
+    # 输出格式（json 或 text）以及 DEBUG 日志的采样比例
+    log_level: str = "INFO"
+    log_levels: str = ""
+    log_format: str = "json"
+    log_debug_sample_rate: float = 1.0
+    
+    # SQL 语句预算检查：off、warn（记录日志）或 enforce（抛出异常，用于本地测试）；
+    # 单个请求内同一语句执行次数达到 sql_repeat_threshold 时视为 N+1 查询
+    sql_budget_mode: str = "warn"
+    sql_repeat_threshold: int = 5
+    
+    # 静态文件：文件名不含内容哈希的文件的缓存时间（秒），元数据索引的过期时间和容量
+    static_max_age: int = 300
+    static_index_ttl: int = 300
+    static_index_size: int = 10000
+    
+    # 幂等键保留时间（小时），过期后同一个键会被视为新请求；过期记录由 scripts.purge_idempotency_keys 清理
+    idempotency_key_ttl_hours: int = 24
+    
+    # 家庭成员身份缓存（秒），只缓存成员；多进程部署时须设置 redis_url 才会缓存（失效在进程间共享）
+    membership_cache_ttl: int = 30
+    membership_cache_size: int = 10000
+    
+    @property
+    def async_database_url(self) -> str:
+        """asyncpg 驱动的连接字符串"""
+        if self.database_async_url:
+            return self.database_async_url
+        return asyncpg_url(self.database_url)
+    
+    @property
+    def read_urls(self) -> List[str]:
+        return [url.strip() for url in self.database_read_urls.split(",") if url.strip()]
     
     class Config:
         env_file = ".env"
         case_sensitive = False
 
 
+def asyncpg_url(url: str) -> str:
+    """将 PostgreSQL 连接字符串改为 asyncpg 驱动"""
+    scheme, rest = url.split("://", 1)
+    return f"postgresql+asyncpg://{rest}" if scheme.startswith("postgresql") else url
+
+
 settings = Settings()
@@ -1,16 +1,43 @@
+from typing import Tuple
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-from app.core.config import settings
+from app.core.config import asyncpg_url, settings
+from app.core.metrics import TimedAsyncQueuePool, TimedQueuePool, register_pool
+from app.core.replicas import ReadReplicas, create_recent_writes, track_writes
+
+
+def pool_limits(engines: int = 1) -> Tuple[int, int]:
+    """每个引擎的 (pool_size, max_overflow)
+
+    设置了 database_max_connections 时，按工作进程数加 database_spare_workers（正在回收、
+    尚未退出的进程）和本进程的引擎数均分连接上限，配置的 pool_size / max_overflow 只会被调小，
+    保证所有进程的连接总数不超过上限。
+    """
+    pool_size, max_overflow = settings.database_pool_size, settings.database_max_overflow
+    if settings.database_max_connections:
+        processes = settings.web_concurrency + settings.database_spare_workers
+        per_engine = max(settings.database_max_connections // (processes * engines), 1)
+        pool_size = min(pool_size, per_engine)
+        max_overflow = max(min(max_overflow, per_engine - pool_size), 0)
+    return pool_size, max_overflow
+
+
+# 本进程连接同一数据库的引擎数，连接上限按引擎均分
+engines_per_process = 2 if settings.database_async else 1
+_pool_size, _max_overflow = pool_limits(engines_per_process)
 
 # 创建数据库引擎
 engine = create_engine(
     settings.database_url,
+    poolclass=TimedQueuePool,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
+    pool_size=_pool_size,
+    max_overflow=_max_overflow
 )
+register_pool("sync", lambda: engine.pool)
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -26,3 +53,88 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# 异步引擎（DATABASE_ASYNC=true 时启用）
+async_engine = None
+AsyncSessionLocal = None
+if settings.database_async:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        settings.async_database_url,
+        poolclass=TimedAsyncQueuePool,
+        pool_pre_ping=True,
+        pool_size=_pool_size,
+        max_overflow=_max_overflow
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autocommit=False, autoflush=False)
+    register_pool("async", lambda: async_engine.pool)
+
+
+async def get_async_db():
+    """获取异步数据库会话"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# 只读副本（设置 DATABASE_READ_URLS 时启用），GET 接口经 get_read_db / get_async_read_db 使用
+read_replicas = ReadReplicas("", [], [], None)
+async_read_replicas = ReadReplicas("async_", [], [], None)
+if settings.read_urls:
+    _recent_writes = create_recent_writes()
+    _replica_engines = [
+        create_engine(
+            url,
+            poolclass=TimedQueuePool,
+            pool_pre_ping=True,
+            pool_size=_pool_size,
+            max_overflow=_max_overflow,
+            connect_args={"connect_timeout": settings.database_replica_connect_timeout}
+        )
+        for url in settings.read_urls
+    ]
+    read_replicas = ReadReplicas(
+        "",
+        _replica_engines,
+        [sessionmaker(autocommit=False, autoflush=False, bind=e) for e in _replica_engines],
+        _recent_writes
+    )
+    if settings.database_async:
+        _async_replica_engines = [
+            create_async_engine(
+                asyncpg_url(url),
+                poolclass=TimedAsyncQueuePool,
+                pool_pre_ping=True,
+                pool_size=_pool_size,
+                max_overflow=_max_overflow,
+                connect_args={"timeout": settings.database_replica_connect_timeout}
+            )
+            for url in settings.read_urls
+        ]
+        async_read_replicas = ReadReplicas(
+            "async_",
+            _async_replica_engines,
+            [async_sessionmaker(e, autocommit=False, autoflush=False) for e in _async_replica_engines],
+            _recent_writes
+        )
+    for _replicas in (read_replicas, async_read_replicas):
+        for _index, _engine in enumerate(_replicas.engines):
+            register_pool(f"{_replicas.name}replica{_index}", lambda e=_engine: e.pool)
+    track_writes(_recent_writes)
+
+
+def all_engines() -> list:
+    """本进程的所有同步引擎（异步引擎取其 sync_engine）"""
+    engines = [engine, *read_replicas.engines]
+    if async_engine is not None:
+        engines.append(async_engine.sync_engine)
+    engines.extend(e.sync_engine for e in async_read_replicas.engines)
+    return engines
+
+
+def dispose_engines_after_fork() -> None:
+    """预加载应用后 fork 出的工作进程调用：丢弃从主进程继承的连接（不关闭，主进程仍持有），
+    之后在本进程中重新建立"""
+    for e in all_engines():
+        e.dispose(close=False)
@@ -1,37 +1,154 @@
 from typing import Optional
+from uuid import UUID
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from jose import JWTError, jwt
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import Session, make_transient_to_detached
 
+from app.core.auth import verify_access_token
+from app.core.cache import MISSING, TTLCache
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import async_read_replicas, get_async_db, get_db, read_replicas
+from app.core.membership import Membership, require_member, require_admin
+from app.core.replicas import set_request_user
 from app.models.user import User
 
 # OAuth2 密码承载令牌
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    """获取当前用户"""
-    credentials_exception = HTTPException(
+# 用户行缓存：user_id -> 列值字典，用户信息修改后调用 invalidate_user_cache
+_user_cache = TTLCache("auth_user", maxsize=settings.auth_user_cache_size, ttl=settings.auth_user_cache_ttl)
+
+
+def invalidate_user_cache(user_id) -> None:
+    """用户信息修改并提交后调用"""
+    _user_cache.pop(str(user_id))
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+
+
+def _authenticate(token: str) -> str:
+    """校验令牌并返回用户ID，同时记录为当前请求的用户"""
+    user_id = verify_access_token(token)
+    if user_id is None:
+        raise _credentials_exception()
+    set_request_user(user_id)
+    return user_id
+
+
+def _cached_user(user_id: str) -> Optional[User]:
+    """由缓存的列值重建用户对象，未命中时返回 None"""
+    values = _user_cache.get(user_id)
+    if values is MISSING:
+        return None
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+
+def _cache_user(user_id: str, user: User) -> None:
+    _user_cache.set(user_id, {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs})
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+    """获取当前用户"""
+    user_id = _authenticate(token)
+    
+    user = _cached_user(user_id)
+    if user is not None:
+        # 重建的对象挂到当前会话，路由中的修改仍能正常提交，不再查询数据库
+        db.add(user)
+        return user
+    
     user = db.query(User).filter(User.id == user_id).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    _cache_user(user_id, user)
     return user
 
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """获取当前活跃用户"""
     return current_user
+
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db=Depends(get_async_db)) -> User:
+    """get_current_user 的异步版本，供 DATABASE_ASYNC=true 时的异步路由使用：
+    缓存未命中时在 asyncpg 连接上查询，不占用同步连接池，也不阻塞事件循环"""
+    user_id = _authenticate(token)
+    
+    user = _cached_user(user_id)
+    if user is not None:
+        db.add(user)
+        return user
+    
+    user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+    if user is None:
+        raise _credentials_exception()
+    _cache_user(user_id, user)
+    return user
+
+
+async def get_current_active_user_async(current_user: User = Depends(get_current_user_async)) -> User:
+    """获取当前活跃用户（异步会话）"""
+    return current_user
+
+
+def get_read_db(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """只读会话，供 GET 接口使用
+
+    配置了只读副本时返回副本会话；用户刚提交过写入、或没有可用副本时返回本请求的主库会话
+    （与 get_db 为同一会话）。认证和 get_family_membership / get_family_admin 仍使用主库会话；
+    路由中以 require_member 检查成员身份时读的是这里返回的会话。
+    """
+    replica = read_replicas.open(current_user.id)
+    if replica is None:
+        yield db
+        return
+    try:
+        yield replica
+    finally:
+        replica.close()
+
+
+async def get_async_read_db(
+    current_user: User = Depends(get_current_active_user_async),
+    db=Depends(get_async_db)
+):
+    """get_read_db 的异步版本（DATABASE_ASYNC=true）"""
+    replica = await async_read_replicas.open_async(current_user.id)
+    if replica is None:
+        yield db
+        return
+    try:
+        yield replica
+    finally:
+        await replica.close()
+
+
+def get_family_membership(
+    family_id: UUID,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+) -> Membership:
+    """路径中 family_id 对应家庭的成员身份，非成员返回 403"""
+    return require_member(db, family_id, current_user.id)
+
+
+def get_family_admin(
+    family_id: UUID,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+) -> Membership:
+    """路径中 family_id 对应家庭的管理员身份，非管理员返回 403"""
+    return require_admin(db, family_id, current_user.id)
@@ -0,0 +1,81 @@
+import hashlib
+from typing import Iterable, Optional
+from uuid import UUID
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models.family import Family, FamilyMember
+
+
+def commit_and_bump_version(db: Session, *family_ids: UUID) -> None:
+    """递增这些家庭的变更版本并提交当前事务，使其读接口的 ETag 和列表缓存失效
+
+    版本号与数据在同一事务中提交，不会出现数据已变而版本未变的情况。UPDATE families
+    作为事务的最后一条语句执行（余额快照、支出计数之后），家庭行锁只从这里持有到提交，
+    同一家庭的写事务只在这一小段上串行；多个家庭按 ID 顺序加锁，避免死锁。
+    """
+    for family_id in sorted(set(family_ids)):
+        db.execute(
+            update(Family)
+            .where(Family.id == family_id)
+            .values(change_version=Family.change_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+
+
+def _etag(version, request: Request, extra: Iterable = ()) -> str:
+    """由版本和请求的路径、查询参数生成弱 ETag"""
+    key = "|".join([request.url.path, request.url.query, *map(str, extra)])
+    return f'W/"{version}-{hashlib.sha1(key.encode()).hexdigest()[:16]}"'
+
+
+def _check_etag(etag: str, request: Request, response: Response) -> None:
+    """If-None-Match 与 etag 相同时返回 304，否则在响应上设置 ETag"""
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+
+def check_family_etag(
+    db: Session,
+    family_id: UUID,
+    request: Request,
+    response: Response,
+    extra: Iterable = ()
+) -> Optional[int]:
+    """If-None-Match 与当前 ETag 相同时直接返回 304，不再执行查询和序列化
+
+    先读版本号再查询数据，数据只会比版本号新，并发写入最多导致客户端多取一次。
+    返回读到的版本号（家庭不存在时为 None），响应缓存以它作为键的一部分，
+    缓存的响应体与 ETag 来自同一版本。
+    """
+    version = db.scalar(select(Family.change_version).where(Family.id == family_id))
+    if version is not None:
+        _check_etag(_etag(version, request, extra), request, response)
+    return version
+
+
+def user_families_version(db: Session, user_id: UUID) -> str:
+    """用户所在家庭及其变更版本的摘要
+
+    加入、退出或删除家庭，以及其中任一家庭有写入时都会变化。
+    """
+    rows = db.execute(
+        select(Family.id, Family.change_version)
+        .join(FamilyMember, FamilyMember.family_id == Family.id)
+        .where(FamilyMember.user_id == user_id)
+        .order_by(Family.id)
+    ).all()
+    key = ",".join(f"{row.id}:{row.change_version}" for row in rows)
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def check_user_families_etag(db: Session, user_id: UUID, request: Request, response: Response) -> str:
+    """家庭列表的 ETag，由用户所在家庭的版本摘要生成，用法同 check_family_etag，返回该摘要"""
+    version = user_families_version(db, user_id)
+    _check_etag(_etag(version, request), request, response)
+    return version
@@ -0,0 +1,164 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import re
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+# 日志在请求线程中只做级别判断、采样和入队，格式化、脱敏和写出都在监听线程中完成
+
+# LogRecord 的标准属性，其余属性（extra 传入的字段）原样输出到 JSON
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+# 名称像密钥的字段，值整体替换
+_SECRET_KEYS = re.compile(r"pass(word|wd)?|secret|token|authorization|api_?key|credential", re.IGNORECASE)
+# 消息文本中的 key=value / "key": "value" 与 Bearer 令牌
+_SECRET_PAIRS = re.compile(
+    r"""(?P<key>["']?(?:\w*pass(?:word|wd)?|\w*secret|\w*token|authorization|api_?key)["']?\s*[:=]\s*)"""
+    r"""(?P<value>"[^"]*"|'[^']*'|[^\s,;}&]+)""",
+    re.IGNORECASE
+)
+_BEARER = re.compile(r"(Bearer\s+)[A-Za-z0-9._~+/=-]+", re.IGNORECASE)
+REDACTED = "***"
+
+_listener: Optional[QueueListener] = None
+
+
+def redact(text: str) -> str:
+    """替换文本中的密码、令牌等取值"""
+    text = _BEARER.sub(r"\1" + REDACTED, text)
+    return _SECRET_PAIRS.sub(lambda m: m.group("key") + REDACTED, text)
+
+
+def _redact_value(key: str, value):
+    if _SECRET_KEYS.search(key):
+        return REDACTED
+    if isinstance(value, dict):
+        return {k: _redact_value(str(k), v) for k, v in value.items()}
+    if isinstance(value, str):
+        return redact(value)
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录输出为一行 JSON，消息和 extra 字段都经过脱敏"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": redact(record.getMessage()),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key != "sample_rate":
+                entry[key] = _redact_value(key, value)
+        if record.exc_text:
+            entry["exc"] = redact(record.exc_text)
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RedactingFormatter(logging.Formatter):
+    """文本格式，用于本地开发"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return redact(super().format(record))
+
+
+class SamplingFilter(logging.Filter):
+    """按比例丢弃高频日志，在入队之前执行
+
+    记录可以通过 extra={"sample_rate": 0.01} 指定保留比例；未指定的 DEBUG 记录
+    使用 log_debug_sample_rate。
+    """
+
+    def __init__(self, debug_rate: float):
+        super().__init__()
+        self.debug_rate = debug_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, "sample_rate", None)
+        if rate is None:
+            if record.levelno != logging.DEBUG:
+                return True
+            rate = self.debug_rate
+        return rate >= 1 or random.random() < rate
+
+
+class _QueueHandler(QueueHandler):
+    """只在调用线程中生成消息文本和异常文本（参数对象可能不能跨线程访问），
+    格式化和脱敏留给监听线程"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_levels(value: str) -> Dict[str, str]:
+    """解析 "app.api.auth=DEBUG,homeledger.sql=WARNING" 形式的分模块级别"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging() -> None:
+    """根日志器经队列交给后台监听线程写出，可重复调用"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if settings.log_format == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(RedactingFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    handler = _QueueHandler(queue.SimpleQueue())
+    handler.addFilter(SamplingFilter(settings.log_debug_sample_rate))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(settings.log_level.upper())
+
+    # uvicorn 自带的处理器直接同步写出，改为经根日志器的队列输出
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    for name, level in parse_levels(settings.log_levels).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """写出队列中剩余的日志并停止监听线程"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def restart_logging_after_fork() -> None:
+    """预加载应用后 fork 出的工作进程调用：监听线程不会被复制到子进程，重新建立队列和监听线程"""
+    global _listener
+    _listener = None
+    setup_logging()
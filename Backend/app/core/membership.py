@@ -0,0 +1,152 @@
+import logging
+from typing import NamedTuple, Optional
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.cache import MISSING, TTLCache
+from app.core.config import settings
+from app.core.replicas import read_cache_ttl
+from app.models.family import FamilyMember
+
+logger = logging.getLogger(__name__)
+
+
+class Membership(NamedTuple):
+    """当前用户在某个家庭中的成员身份"""
+    id: UUID
+    role: str
+
+
+class MemoryMembershipCache:
+    """进程内缓存，只用于单进程部署：失效只作用于本进程"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache("membership", maxsize=maxsize, ttl=ttl)
+
+    def get(self, family_id: UUID, user_id: UUID) -> Optional[Membership]:
+        membership = self._entries.get((user_id, family_id))
+        return None if membership is MISSING else membership
+
+    def set(self, family_id: UUID, user_id: UUID, membership: Membership, ttl: Optional[float] = None) -> None:
+        self._entries.set((user_id, family_id), membership, ttl)
+
+    def pop(self, family_id: UUID, user_id: Optional[UUID] = None) -> None:
+        if user_id is not None:
+            self._entries.pop((user_id, family_id))
+        else:
+            self._entries.pop_where(lambda key: key[1] == family_id)
+
+
+class RedisMembershipCache:
+    """Redis 中缓存成员身份，所有工作进程共享，任一进程的失效对其他进程立即可见"""
+
+    def __init__(self, url: str, ttl: float, prefix: str = "homeledger:member:"):
+        import redis  # 仅在配置了 redis_url 时需要
+
+        self._redis = redis.Redis.from_url(url)
+        self._errors = redis.RedisError
+        self._ttl = ttl
+        self._prefix = prefix
+
+    def _key(self, family_id: UUID, user_id: UUID) -> str:
+        return f"{self._prefix}{family_id}:{user_id}"
+
+    def get(self, family_id: UUID, user_id: UUID) -> Optional[Membership]:
+        try:
+            raw = self._redis.get(self._key(family_id, user_id))
+        except self._errors:
+            # 无法读取时查数据库
+            logger.warning("failed to read membership cache", exc_info=True)
+            return None
+        if raw is None:
+            return None
+        member_id, role = raw.decode().split(":", 1)
+        return Membership(UUID(member_id), role)
+
+    def set(self, family_id: UUID, user_id: UUID, membership: Membership, ttl: Optional[float] = None) -> None:
+        try:
+            self._redis.set(
+                self._key(family_id, user_id),
+                f"{membership.id}:{membership.role}",
+                px=int((self._ttl if ttl is None else ttl) * 1000)
+            )
+        except self._errors:
+            logger.warning("failed to write membership cache", exc_info=True)
+
+    def pop(self, family_id: UUID, user_id: Optional[UUID] = None) -> None:
+        try:
+            if user_id is not None:
+                self._redis.delete(self._key(family_id, user_id))
+            else:
+                keys = list(self._redis.scan_iter(match=f"{self._prefix}{family_id}:*"))
+                if keys:
+                    self._redis.delete(*keys)
+        except self._errors:
+            logger.error("failed to invalidate membership cache", exc_info=True)
+
+
+def _create_membership_cache():
+    """选择成员身份缓存的后端，返回 None 时不缓存
+
+    配置了 redis_url 时各工作进程共享缓存和失效。多进程部署而没有 Redis 时不缓存，
+    否则被移除的成员在其他进程中仍能访问，直到条目过期。
+    """
+    if settings.redis_url:
+        return RedisMembershipCache(settings.redis_url, settings.membership_cache_ttl)
+    if settings.web_concurrency > 1:
+        return None
+    return MemoryMembershipCache(settings.membership_cache_size, settings.membership_cache_ttl)
+
+
+_membership_cache = _create_membership_cache()
+
+
+def get_membership(db: Session, family_id: UUID, user_id: UUID) -> Optional[Membership]:
+    """获取用户在家庭中的成员身份，优先读缓存
+
+    只缓存成员；非成员每次都查询数据库，加入家庭后立即生效。
+    """
+    if _membership_cache is not None:
+        membership = _membership_cache.get(family_id, user_id)
+        if membership is not None:
+            return membership
+    row = db.query(FamilyMember.id, FamilyMember.role).filter(
+        FamilyMember.family_id == family_id,
+        FamilyMember.user_id == user_id
+    ).first()
+    if row is None:
+        return None
+    membership = Membership(row.id, row.role)
+    if _membership_cache is not None:
+        _membership_cache.set(family_id, user_id, membership, read_cache_ttl(db))
+    return membership
+
+
+def require_member(db: Session, family_id: UUID, user_id: UUID) -> Membership:
+    """要求用户是家庭成员"""
+    membership = get_membership(db, family_id, user_id)
+    if not membership:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not a member of this family"
+        )
+    return membership
+
+
+def require_admin(db: Session, family_id: UUID, user_id: UUID) -> Membership:
+    """要求用户是家庭管理员"""
+    membership = get_membership(db, family_id, user_id)
+    if not membership or membership.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not an admin of this family"
+        )
+    return membership
+
+
+def invalidate_membership(family_id: UUID, user_id: Optional[UUID] = None) -> None:
+    """成员关系变更并提交后调用；不传 user_id 时失效整个家庭"""
+    if _membership_cache is not None:
+        _membership_cache.pop(family_id, user_id)
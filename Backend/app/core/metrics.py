@@ -0,0 +1,337 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 以 Prometheus 文本格式（0.0.4）输出的进程内指标
+#
+# 多个工作进程部署时每个进程各有一份数据，抓取到的是处理该次 /metrics 请求的进程，
+# 按进程区分需要每个进程单独暴露端口，或者只用单进程做容量评估。
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+_metrics: List["_Metric"] = []
+_collectors: List[Callable[[], List[str]]] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return super().render() + [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签 -> [各桶计数（非累计）..., +Inf 桶计数, 总和]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(state)) for labels, state in self._values.items()]
+        lines = super().render()
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket_labels = _labels(self.labelnames, labels, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(state[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def register_collector(collector: Callable[[], List[str]]) -> None:
+    """登记抓取时才计算的指标（如连接池当前状态），collector 返回文本行"""
+    _collectors.append(collector)
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+def gauge_lines(name: str, help: str, samples: Sequence[Tuple[Dict[str, str], float]]) -> List[str]:
+    """将一组 (标签, 值) 输出为 gauge 文本行"""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+    return lines
+
+
+# ---- HTTP 请求 ----
+
+http_requests = Counter("http_requests_total", "HTTP requests by route, method and status", ("route", "method", "status"))
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency", ("route", "method"))
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being handled", ("route",))
+request_sql_statements = Histogram(
+    "http_request_sql_statements", "SQL statements executed per request", ("route",), buckets=COUNT_BUCKETS
+)
+request_sql_duration = Histogram("http_request_sql_duration_seconds", "Total SQL time per request", ("route",))
+
+# ---- SQL ----
+
+sql_statement_duration = Histogram("sqlalchemy_statement_duration_seconds", "SQL statement execution time")
+pool_checkout_duration = Histogram(
+    "sqlalchemy_pool_checkout_duration_seconds", "Time spent waiting for a pooled connection", ("pool",)
+)
+
+
+class RequestStats:
+    """单个请求内的 SQL 统计；经 contextvar 传递到线程池中执行的同步路由"""
+    __slots__ = ("statements", "sql_seconds", "shapes")
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+        # 语句文本（参数已绑定为占位符）-> 执行次数，用于发现 N+1 查询
+        self.shapes: Dict[str, int] = {}
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[RequestStats]:
+    """统计代码块内（包括其中提交到线程池的调用）执行的 SQL 语句，用于脚本和本地检查：
+
+        with track_queries() as stats:
+            list_transactions(db, user_id, request, response, family_id)
+        assert stats.statements <= 4
+    """
+    token = _request_stats.set(RequestStats())
+    try:
+        yield _request_stats.get()
+    finally:
+        _request_stats.reset(token)
+
+
+_request_hooks: List[Callable[[Scope, str, RequestStats], None]] = []
+
+
+def register_request_hook(hook: Callable[[Scope, str, RequestStats], None]) -> None:
+    """登记请求结束时调用的检查，参数为 (scope, 路由模板, SQL 统计)"""
+    _request_hooks.append(hook)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    sql_statement_duration.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_seconds += elapsed
+        stats.shapes[statement] = stats.shapes.get(statement, 0) + 1
+
+
+class _TimedCheckout:
+    """记录从连接池取得连接的等待时间（池满时会阻塞直到有连接归还或超时）"""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            pool_checkout_duration.observe(time.perf_counter() - start, self.metrics_name)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    metrics_name = "sync"
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics_name = "async"
+
+
+_pools: Dict[str, Callable] = {}
+
+
+def register_pool(name: str, pool_getter: Callable) -> None:
+    """登记连接池，抓取时输出其大小、已借出、溢出和空闲连接数
+
+    pool_getter 每次返回当前的连接池（engine.dispose() 后连接池对象会被替换）。
+    """
+    _pools[name] = pool_getter
+
+
+def _pool_lines() -> List[str]:
+    pools = [({"pool": name}, getter()) for name, getter in _pools.items()]
+    return (
+        gauge_lines("sqlalchemy_pool_size", "Configured pool_size", [(l, p.size()) for l, p in pools])
+        + gauge_lines("sqlalchemy_pool_checked_out", "Connections currently checked out", [(l, p.checkedout()) for l, p in pools])
+        + gauge_lines(
+            "sqlalchemy_pool_overflow",
+            "Connections opened beyond pool_size (negative while the pool is filling)",
+            [(l, p.overflow()) for l, p in pools]
+        )
+        + gauge_lines("sqlalchemy_pool_checked_in", "Idle connections in the pool", [(l, p.checkedin()) for l, p in pools])
+    )
+
+
+register_collector(_pool_lines)
+
+
+def _threadpool_lines() -> List[str]:
+    """同步路由和 run_in_threadpool 使用的 AnyIO 默认线程池；须在事件循环中调用"""
+    import anyio.to_thread
+
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    statistics = limiter.statistics()
+    return (
+        gauge_lines("threadpool_threads_limit", "Maximum worker threads", [({}, limiter.total_tokens)])
+        + gauge_lines("threadpool_threads_busy", "Worker threads currently in use", [({}, statistics.borrowed_tokens)])
+        + gauge_lines("threadpool_tasks_waiting", "Calls waiting for a free worker thread", [({}, statistics.tasks_waiting)])
+    )
+
+
+register_collector(_threadpool_lines)
+
+
+def _route_label(scope: Scope) -> str:
+    """使用路由模板而不是实际路径，避免 ID 造成标签数量无限增长"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if "endpoint" in scope:
+        # 挂载的子应用（静态文件）
+        return scope.get("root_path") or "/"
+    return "<unmatched>"
+
+
+class MetricsMiddleware:
+    """记录每个请求的延迟、状态码、并发数和 SQL 语句数"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._prefixes: Optional[set] = None
+
+    @staticmethod
+    def _path_prefix(path: str) -> str:
+        segments = path.strip("/").split("/")
+        return "/" + "/".join(segments[:2] if segments[0] == "api" else segments[:1])
+
+    def _prefix(self, scope: Scope) -> str:
+        """已注册路由的路径前缀，其他路径归为 <other>，避免任意路径产生新标签"""
+        if self._prefixes is None:
+            self._prefixes = {
+                self._path_prefix(route.path) for route in scope["app"].routes if hasattr(route, "path")
+            }
+        prefix = self._path_prefix(scope["path"])
+        return prefix if prefix in self._prefixes else "<other>"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        # 路由要在调用应用后才能确定，并发数按路径前缀（如 /api/transactions、/static）统计
+        in_flight_label = self._prefix(scope)
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        http_in_flight.inc(in_flight_label)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_flight.dec(in_flight_label)
+            _request_stats.reset(token)
+            route = _route_label(scope)
+            http_requests.inc(route, scope["method"], status)
+            http_latency.observe(elapsed, route, scope["method"])
+            request_sql_statements.observe(stats.statements, route)
+            request_sql_duration.observe(stats.sql_seconds, route)
+        for hook in _request_hooks:
+            hook(scope, route, stats)
@@ -0,0 +1,63 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+# 下一页游标通过响应头返回，列表接口的响应体保持不变
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# 列表接口单页最大条数
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(created_at: datetime, id: UUID) -> str:
+    """将 (created_at, id) 编码为不透明游标"""
+    raw = json.dumps([created_at.isoformat(), str(id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """解码游标，格式错误时返回 400"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+        return datetime.fromisoformat(created_at), UUID(id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def paginate(
+    query: Query,
+    model,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100
+) -> list:
+    """按 (created_at, id) 倒序分页
+
+    传入 cursor 时使用键集分页（忽略 skip），每页代价与页码无关；
+    否则沿用 offset 分页。两种模式下，如果还有下一页，都会在响应头中返回下一页游标。
+    """
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, id))
+    else:
+        query = query.offset(skip)
+
+    # 多取一行用于判断是否还有下一页
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+    return rows
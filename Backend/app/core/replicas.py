@@ -0,0 +1,183 @@
+import itertools
+import logging
+import time
+from contextvars import ContextVar
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.core.cache import MISSING, TTLCache
+from app.core.config import settings
+from app.core.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+# 读请求的去向：target 为 replicaN 或 primary，reason 为 replica（正常路由）、
+# sticky（用户刚写入过）或 unavailable（没有可用副本）
+read_sessions = Counter(
+    "database_read_sessions_total", "Read-only sessions by target database and routing reason", ("target", "reason")
+)
+replica_failures = Counter(
+    "database_replica_failures_total", "Replica connection failures that took a replica out of rotation", ("replica",)
+)
+
+# 当前请求的用户，由 get_current_user 设置；提交写事务时据此记录写入时间
+_request_user: ContextVar[Optional[str]] = ContextVar("request_user", default=None)
+
+
+def set_request_user(user_id) -> None:
+    _request_user.set(str(user_id))
+
+
+class MemoryRecentWrites:
+    """进程内记录最近写入过的用户；多进程部署时其他进程看不到，应配置 redis_url"""
+
+    def __init__(self, ttl: float):
+        self._users = TTLCache("recent_writes", maxsize=100000, ttl=ttl)
+
+    def mark(self, user_id: str) -> None:
+        self._users.set(user_id, True)
+
+    def is_recent(self, user_id: str) -> bool:
+        return self._users.get(user_id) is not MISSING
+
+
+class RedisRecentWrites:
+    """Redis 中记录最近写入过的用户，所有工作进程共享"""
+
+    def __init__(self, url: str, ttl: float, prefix: str = "homeledger:rw:"):
+        import redis  # 仅在启用该后端时需要
+
+        self._redis = redis.Redis.from_url(url)
+        self._errors = redis.RedisError
+        self._ttl_ms = int(ttl * 1000)
+        self._prefix = prefix
+
+    def mark(self, user_id: str) -> None:
+        try:
+            self._redis.set(self._prefix + user_id, 1, px=self._ttl_ms)
+        except self._errors:
+            logger.warning("failed to record write for read stickiness", exc_info=True)
+
+    def is_recent(self, user_id: str) -> bool:
+        try:
+            return bool(self._redis.exists(self._prefix + user_id))
+        except self._errors:
+            # 无法确认时读主库
+            logger.warning("failed to check read stickiness", exc_info=True)
+            return True
+
+
+class ReadReplicas:
+    """只读副本的路由
+
+    从健康的副本中选择已借出连接最少的一个，借出数相同时轮询；用户在
+    database_read_sticky_seconds 内提交过写事务时读主库，保证读到自己的写入。
+    副本连接失败（建立连接时或查询中断开）后在 database_replica_retry_seconds 内
+    不再使用，全部不可用时读主库。
+    """
+
+    def __init__(self, name: str, engines: Sequence, sessionmakers: Sequence, recent_writes):
+        self.name = name
+        self.engines = list(engines)
+        self.sessionmakers = list(sessionmakers)
+        self.recent_writes = recent_writes
+        self._down_until = [0.0] * len(self.engines)
+        self._turn = itertools.count()
+        for index, engine in enumerate(self.engines):
+            sync_engine = getattr(engine, "sync_engine", engine)
+            event.listen(sync_engine, "handle_error", self._on_error(index))
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def _on_error(self, index: int):
+        def handle_error(context):
+            if context.is_disconnect:
+                self.mark_down(index, context.original_exception)
+        return handle_error
+
+    def mark_down(self, index: int, exc: BaseException) -> None:
+        if self._down_until[index] <= time.monotonic():
+            replica_failures.inc(self._label(index))
+            logger.warning(
+                "replica %s unavailable, retrying in %ss: %s",
+                self._label(index), settings.database_replica_retry_seconds, exc
+            )
+        self._down_until[index] = time.monotonic() + settings.database_replica_retry_seconds
+
+    def _label(self, index: int) -> str:
+        return f"{self.name}replica{index}"
+
+    def candidates(self, user_id) -> Tuple[List[int], str]:
+        """按优先顺序排列的可用副本；返回空列表时读主库"""
+        if not self.engines:
+            return [], "unavailable"
+        if self.recent_writes.is_recent(str(user_id)):
+            return [], "sticky"
+        now = time.monotonic()
+        count = len(self.engines)
+        start = next(self._turn) % count
+        healthy = [i for i in range(count) if self._down_until[i] <= now]
+        healthy.sort(key=lambda i: (self.engines[i].pool.checkedout(), (i - start) % count))
+        return healthy, "replica" if healthy else "unavailable"
+
+    def open(self, user_id) -> Optional[Session]:
+        """打开并连接一个副本会话，应读主库时返回 None"""
+        indices, reason = self.candidates(user_id)
+        for index in indices:
+            db = self.sessionmakers[index]()
+            try:
+                db.connection()
+            except DBAPIError as e:
+                db.close()
+                self.mark_down(index, e)
+                continue
+            db.info["replica"] = index
+            read_sessions.inc(self._label(index), reason)
+            return db
+        read_sessions.inc("primary", reason if reason == "sticky" else "unavailable")
+        return None
+
+    async def open_async(self, user_id):
+        """open 的异步版本，返回 AsyncSession 或 None"""
+        indices, reason = self.candidates(user_id)
+        for index in indices:
+            db = self.sessionmakers[index]()
+            try:
+                await db.connection()
+            except DBAPIError as e:
+                await db.close()
+                self.mark_down(index, e)
+                continue
+            db.sync_session.info["replica"] = index
+            read_sessions.inc(self._label(index), reason)
+            return db
+        read_sessions.inc("primary", reason if reason == "sticky" else "unavailable")
+        return None
+
+
+def create_recent_writes():
+    if settings.redis_url:
+        return RedisRecentWrites(settings.redis_url, settings.database_read_sticky_seconds)
+    return MemoryRecentWrites(settings.database_read_sticky_seconds)
+
+
+def track_writes(recent_writes) -> None:
+    """主库会话提交时记录当前请求的用户，之后的读请求在粘滞时间内走主库"""
+    @event.listens_for(Session, "after_commit")
+    def _after_commit(session):
+        user_id = _request_user.get()
+        if user_id is not None and "replica" not in session.info:
+            recent_writes.mark(user_id)
+
+
+def read_cache_ttl(db: Session) -> Optional[float]:
+    """从副本读到的数据写入缓存时使用的过期时间
+
+    缓存在写入提交后立即失效，而副本可能尚未复制该写入，读到的旧数据会被重新缓存；
+    将这类条目的过期时间限制为粘滞时间。主库会话返回 None（使用缓存的默认值）。
+    """
+    return settings.database_read_sticky_seconds if "replica" in db.info else None
@@ -0,0 +1,180 @@
+import json
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from app.core.cache import TTLCache, register_stats
+from app.core.config import settings
+
+# 缓存条目：(响应体, 需要随响应返回的头部)
+Entry = Tuple[bytes, Dict[str, str]]
+
+# ETag 随每个请求重新计算，不缓存
+_SKIP_HEADERS = {"content-length", "content-type", "etag"}
+
+_adapters: Dict[Any, TypeAdapter] = {}
+
+
+def _serialize(response_type: Any, value: Any) -> bytes:
+    """按响应模型校验（支持 ORM 对象）并序列化为 JSON"""
+    adapter = _adapters.get(response_type)
+    if adapter is None:
+        adapter = _adapters[response_type] = TypeAdapter(response_type)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+class MemoryBackend:
+    """进程内后端：条目放在 LRU + TTL 缓存中
+
+    缓存键包含数据库中的版本号，多进程部署时各进程的缓存互不影响，只是各自命中。
+    """
+
+    name = "memory"
+
+    def __init__(self, maxsize: int, ttl: int):
+        self._entries = TTLCache("response_cache_entries", maxsize=maxsize, ttl=ttl)
+
+    def get(self, key: str) -> Optional[Entry]:
+        return self._entries.get(key, None)
+
+    def set(self, key: str, entry: Entry, ttl: Optional[float] = None) -> None:
+        self._entries.set(key, entry, ttl)
+
+    def size(self) -> int:
+        return self._entries.stats()["size"]
+
+
+class RedisBackend:
+    """Redis 后端：多个工作进程共享条目，一个进程缓存的响应其他进程也能命中
+
+    条目以 SETEX 写入并在 ttl 后过期；容量由 Redis 的 maxmemory 与
+    allkeys-lru 淘汰策略限制。
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, ttl: int, prefix: str = "homeledger:rc:"):
+        import redis  # 仅在启用该后端时需要
+
+        self._redis = redis.Redis.from_url(url)
+        self._ttl = ttl
+        self._prefix = prefix
+
+    def get(self, key: str) -> Optional[Entry]:
+        raw = self._redis.get(self._prefix + key)
+        if raw is None:
+            return None
+        headers_len = int.from_bytes(raw[:4], "big")
+        return raw[4 + headers_len:], json.loads(raw[4:4 + headers_len])
+
+    def set(self, key: str, entry: Entry, ttl: Optional[float] = None) -> None:
+        body, headers = entry
+        encoded = json.dumps(headers).encode()
+        self._redis.setex(self._prefix + key, max(int(ttl or self._ttl), 1), len(encoded).to_bytes(4, "big") + encoded + body)
+
+    def size(self) -> int:
+        return -1
+
+
+class ResponseCache:
+    """按 (路由, 作用域, 版本, 调用者角色, 查询参数) 缓存序列化后的列表响应
+
+    作用域为 family:<id> 或 user:<id>；版本是生成 ETag 时从数据库读到的家庭变更版本
+    （家庭列表为用户所在家庭的版本摘要）。写操作提交后版本变化，旧版本下的条目不再被
+    命中，随 LRU/TTL 自然淘汰；缓存的响应体总是与同一版本的 ETag 一起返回。
+    """
+
+    def __init__(self, backend, max_entry_bytes: int):
+        self.backend = backend
+        self.max_entry_bytes = max_entry_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, route: str, scope: str, version: Any, role: str, request: Request) -> str:
+        """生成缓存键，version 为 check_family_etag / check_user_families_etag 的返回值
+
+        版本号在查询数据之前读取，按该版本保存的数据只会比版本号新。
+        """
+        return f"{route}|{scope}|{version}|{role}|{request.url.query}"
+
+    def get(self, key: str, response: Response) -> Optional[Response]:
+        """命中时返回可直接返回给客户端的响应，合并当前请求已设置的头部（如 ETag）"""
+        entry = self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        body, headers = entry
+        return Response(content=body, media_type="application/json", headers={**headers, **response.headers})
+
+    def put(self, key: str, response_type: Any, value: Any, response: Response, ttl: Optional[float] = None) -> Response:
+        """按响应模型序列化并写入缓存，返回响应
+
+        ttl 为空时使用后端的默认过期时间；从副本读到的数据传入 read_cache_ttl(db)，
+        使其最多缓存粘滞时间。
+        """
+        body = _serialize(response_type, value)
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _SKIP_HEADERS}
+        if len(body) <= self.max_entry_bytes:
+            self.backend.set(key, (body, headers), ttl)
+        return Response(content=body, media_type="application/json", headers=dict(response.headers))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "size": self.backend.size(),
+            "maxsize": settings.response_cache_size,
+        }
+
+
+class NullCache(ResponseCache):
+    """关闭缓存时使用：从不命中，也不保存"""
+
+    def __init__(self):
+        super().__init__(backend=None, max_entry_bytes=0)
+
+    def key(self, route: str, scope: str, version: Any, role: str, request: Request) -> str:
+        return ""
+
+    def get(self, key: str, response: Response) -> Optional[Response]:
+        return None
+
+    def put(self, key: str, response_type: Any, value: Any, response: Response, ttl: Optional[float] = None) -> Response:
+        return Response(
+            content=_serialize(response_type, value),
+            media_type="application/json",
+            headers=dict(response.headers)
+        )
+
+
+def family_scope(family_id: UUID) -> str:
+    return f"family:{family_id}"
+
+
+def user_scope(user_id: UUID) -> str:
+    return f"user:{user_id}"
+
+
+def _create_cache() -> ResponseCache:
+    backend_name = settings.response_cache_backend
+    if backend_name == "auto":
+        # 配置了 Redis 时各工作进程共享缓存
+        backend_name = "redis" if settings.redis_url else "memory"
+    if backend_name == "memory":
+        backend = MemoryBackend(settings.response_cache_size, settings.response_cache_ttl)
+    elif backend_name == "redis":
+        backend = RedisBackend(settings.redis_url, settings.response_cache_ttl)
+    else:
+        return NullCache()
+    return ResponseCache(backend, settings.response_cache_max_entry_bytes)
+
+
+response_cache = _create_cache()
+if not isinstance(response_cache, NullCache):
+    register_stats("response_cache", response_cache)
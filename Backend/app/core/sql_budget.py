@@ -0,0 +1,82 @@
+import logging
+from typing import List, Optional, Tuple
+
+from starlette.types import Scope
+
+from app.core.config import settings
+from app.core.metrics import Counter, RequestStats, register_request_hook
+
+logger = logging.getLogger("homeledger.sql")
+
+
+sql_budget_exceeded = Counter(
+    "http_request_sql_budget_exceeded_total", "Requests that ran more SQL statements than their budget", ("route",)
+)
+sql_repeated_statements = Counter(
+    "http_request_sql_repeated_statements_total", "Requests that repeated one SQL statement shape", ("route",)
+)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """SQL_BUDGET_MODE=enforce 时，请求的 SQL 语句数超出预算或出现重复语句
+
+    在中间件中于响应发送之后抛出，TestClient 会把它重新抛给调用方。
+    """
+    pass
+
+
+def sql_budget(max_statements: int):
+    """声明路由的 SQL 语句预算，写在路由装饰器之下：
+
+        @router.delete("/{task_id}")
+        @sql_budget(6)
+        def delete_task(...):
+
+    预算按缓存未命中的情况计算，包含认证、成员身份等依赖中的查询。
+    """
+    def decorator(func):
+        func.sql_budget = max_statements
+        return func
+    return decorator
+
+
+def repeated_statements(stats: RequestStats, threshold: int) -> List[Tuple[str, int]]:
+    """执行次数达到阈值的语句及其次数"""
+    return sorted(
+        ((statement, count) for statement, count in stats.shapes.items() if count >= threshold),
+        key=lambda item: -item[1]
+    )
+
+
+def _shorten(statement: str, limit: int = 200) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+def check_request(scope: Scope, route: str, stats: RequestStats) -> None:
+    """请求结束时检查语句预算和重复语句；warn 模式只记录日志，enforce 模式抛出异常"""
+    mode = settings.sql_budget_mode
+    if mode == "off":
+        return
+
+    problems = []
+    endpoint = getattr(scope.get("route"), "endpoint", None)
+    budget: Optional[int] = getattr(endpoint, "sql_budget", None)
+    if budget is not None and stats.statements > budget:
+        sql_budget_exceeded.inc(route)
+        problems.append(f"{stats.statements} SQL statements, budget is {budget}")
+
+    repeated = repeated_statements(stats, settings.sql_repeat_threshold)
+    if repeated:
+        sql_repeated_statements.inc(route)
+        problems.extend(f"statement repeated {count} times: {_shorten(statement)}" for statement, count in repeated)
+
+    if not problems:
+        return
+    message = f"{scope['method']} {route}: " + "; ".join(problems)
+    if mode == "enforce":
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+register_request_hook(check_request)
@@ -0,0 +1,228 @@
+import hashlib
+import os
+import re
+import stat
+from email.utils import formatdate
+from mimetypes import guess_type
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+import anyio
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import PlainTextResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from app.core.cache import MISSING, TTLCache
+from app.core.config import settings
+
+# 文件名中含内容哈希（如头像变体 {sha256[:32]}_60.webp）的文件内容永不改变
+_CONTENT_HASHED = re.compile(r"(^|[._-])[0-9a-f]{32,64}([._-]|$)")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# 预压缩文件的后缀，按优先顺序
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+class StaticEntry(NamedTuple):
+    """索引中的文件元数据"""
+    full_path: str
+    size: int
+    etag: str
+    last_modified: str
+    media_type: str
+    cache_control: str
+    # 编码 -> (路径, 大小)
+    encodings: Dict[str, Tuple[str, int]]
+
+
+def _etag(stat_result: os.stat_result, suffix: str = "") -> str:
+    digest = hashlib.md5(f"{stat_result.st_mtime}-{stat_result.st_size}".encode(), usedforsecurity=False)
+    return f'"{digest.hexdigest()}{suffix}"'
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    """Accept-Encoding 中可接受（q 不为 0）的编码"""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def _parse_range(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """解析单个字节区间，返回 (起点, 长度)；多区间或格式错误时返回 None（按整个文件响应），
+    区间无法满足时抛出 416"""
+    unit, _, ranges = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, sep, last = ranges.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # bytes=-N 表示最后 N 个字节
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start > end and first and last:
+        return None
+    if start >= size or (not first and not last):
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    end = min(end, size - 1)
+    return start, end - start + 1
+
+
+class FileSliceResponse(Response):
+    """从文件的指定偏移分块发送给定长度，文件在发送响应头之前打开"""
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        start: int,
+        length: int,
+        status_code: int,
+        headers: Dict[str, str],
+        media_type: str,
+        send_body: bool,
+        on_missing: Callable[[], None],
+    ):
+        super().__init__(status_code=status_code, headers={**headers, "content-length": str(length)}, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.length = length
+        self.send_body = send_body
+        self.on_missing = on_missing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            f = await anyio.open_file(self.path, "rb")
+        except FileNotFoundError:
+            # 索引中的文件已被删除
+            self.on_missing()
+            await PlainTextResponse("Not Found", status_code=404)(scope, receive, send)
+            return
+        async with f:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if self.send_body:
+                await f.seek(self.start)
+                remaining = self.length
+                while remaining > 0:
+                    chunk = await f.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class CachedStaticFiles(StaticFiles):
+    """带元数据索引和缓存头的静态文件服务
+
+    - 文件元数据（大小、ETag、预压缩版本）缓存在进程内索引中，命中时不再 stat；
+      条目 static_index_ttl 秒后过期，文件被删除时在打开失败时移出索引
+    - 文件名含内容哈希的文件返回一年的 immutable 缓存头，其他文件缓存 static_max_age 秒
+    - 支持 If-None-Match / If-Modified-Since（304）和单区间 Range（206）
+    - 存在 .br / .gz 同名文件且客户端接受时直接返回预压缩内容；Range 请求总是返回原文件
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.index = TTLCache("static_index", maxsize=settings.static_index_size, ttl=settings.static_index_ttl)
+
+    def _lookup(self, path: str) -> Optional[StaticEntry]:
+        full_path, stat_result = self.lookup_path(path)
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            return None
+        encodings = {}
+        for encoding, suffix in PRECOMPRESSED:
+            try:
+                variant = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            if stat.S_ISREG(variant.st_mode):
+                encodings[encoding] = (full_path + suffix, variant.st_size)
+        hashed = _CONTENT_HASHED.search(os.path.basename(full_path)) is not None
+        return StaticEntry(
+            full_path=full_path,
+            size=stat_result.st_size,
+            etag=_etag(stat_result),
+            last_modified=formatdate(stat_result.st_mtime, usegmt=True),
+            media_type=guess_type(full_path)[0] or "text/plain",
+            cache_control=IMMUTABLE_CACHE_CONTROL if hashed else f"public, max-age={settings.static_max_age}",
+            encodings=encodings,
+        )
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+
+        entry = self.index.get(path, MISSING)
+        if entry is MISSING:
+            try:
+                entry = await run_in_threadpool(self._lookup, path)
+            except PermissionError:
+                raise HTTPException(status_code=401)
+            # 不存在的文件不进索引，上传后立即可见
+            if entry is None:
+                raise HTTPException(status_code=404)
+            self.index.set(path, entry)
+
+        request_headers = Headers(scope=scope)
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and if_range and if_range not in (entry.etag, entry.last_modified):
+            range_header = None
+
+        encoding = None
+        if entry.encodings and not range_header:
+            accepted = _accepted_encodings(request_headers.get("accept-encoding", ""))
+            encoding = next((e for e, _ in PRECOMPRESSED if e in entry.encodings and e in accepted), None)
+
+        headers = {
+            "etag": entry.etag if encoding is None else entry.etag[:-1] + f'-{encoding}"',
+            "last-modified": entry.last_modified,
+            "cache-control": entry.cache_control,
+            "accept-ranges": "bytes",
+        }
+        if entry.encodings:
+            headers["vary"] = "Accept-Encoding"
+
+        if self.is_not_modified(Headers(headers), request_headers):
+            return NotModifiedResponse(Headers(headers))
+
+        file_path, size = (entry.full_path, entry.size) if encoding is None else entry.encodings[encoding]
+        if encoding is not None:
+            headers["content-encoding"] = encoding
+
+        start, length, status_code = 0, size, 200
+        if range_header:
+            parsed = _parse_range(range_header, size)
+            if parsed is not None:
+                start, length = parsed
+                status_code = 206
+                headers["content-range"] = f"bytes {start}-{start + length - 1}/{size}"
+
+        return FileSliceResponse(
+            file_path,
+            start,
+            length,
+            status_code=status_code,
+            headers=headers,
+            media_type=entry.media_type,
+            send_body=scope["method"] == "GET",
+            on_missing=lambda: self.index.pop(path),
+        )
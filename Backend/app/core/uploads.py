@@ -0,0 +1,115 @@
+import os
+import tempfile
+from typing import List, NamedTuple, Optional
+
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from multipart.multipart import MultipartParser, parse_options_header
+
+
+# 请求体中文件内容之外的部分（分隔符、各部分的头部、其他字段）允许的字节数
+MULTIPART_OVERHEAD = 16 * 1024
+
+
+class SavedUpload(NamedTuple):
+    """已写入临时文件的上传文件"""
+    path: str
+    filename: str
+    size: int
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File too large (max {max_bytes} bytes)"
+    )
+
+
+async def receive_upload(request: Request, field: str, directory: str, max_bytes: int) -> SavedUpload:
+    """流式解析 multipart 请求体，把指定字段的文件分块写入 directory 下的临时文件
+
+    请求体边接收边解析，内存中只保留当前分块；写文件在线程池中执行，不阻塞事件循环。
+    文件超过 max_bytes、或整个请求体超过 max_bytes + MULTIPART_OVERHEAD 时立即中止并返回 413；
+    分块传输时没有 Content-Length，其他字段、前导和结尾部分同样计入总长度。临时文件与目标
+    在同一目录，调用方可用 os.replace 原子地替换为正式文件；出错时临时文件会被删除。
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected multipart/form-data")
+
+    # 请求头声明的长度已超出上限时不读取请求体
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+        raise _too_large(max_bytes)
+
+    state = {"header_field": b"", "header_value": b"", "headers": {}, "target": False, "filename": None, "found": False}
+    pending: List[bytes] = []
+
+    def on_part_begin():
+        state["headers"] = {}
+        state["target"] = False
+
+    def on_header_field(data, start, end):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["header_field"].lower()] = state["header_value"]
+        state["header_field"] = b""
+        state["header_value"] = b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        if disposition.get(b"name", b"").decode() == field and b"filename" in disposition and not state["found"]:
+            state["target"] = True
+            state["found"] = True
+            state["filename"] = disposition[b"filename"].decode("utf-8", "replace")
+
+    def on_part_data(data, start, end):
+        if state["target"]:
+            pending.append(data[start:end])
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+    })
+
+    fd, path = await run_in_threadpool(tempfile.mkstemp, dir=directory, prefix=".upload-")
+    f = os.fdopen(fd, "wb")
+    size = 0
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes + MULTIPART_OVERHEAD:
+                raise _too_large(max_bytes)
+            parser.write(chunk)
+            if pending:
+                data = b"".join(pending)
+                pending.clear()
+                size += len(data)
+                if size > max_bytes:
+                    raise _too_large(max_bytes)
+                await run_in_threadpool(f.write, data)
+        parser.finalize()
+        await run_in_threadpool(f.close)
+        if not state["found"]:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Missing file field '{field}'")
+    except BaseException:
+        f.close()
+        await run_in_threadpool(_remove, path)
+        raise
+
+    return SavedUpload(path=path, filename=state["filename"] or "", size=size)
+
+
+def _remove(path: Optional[str]) -> None:
+    if path and os.path.exists(path):
+        os.remove(path)
@@ -1,10 +1,22 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import os
 
 from app.core.config import settings
+from app.core.logging_config import setup_logging
 from app.api import api_router
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.services.idempotency import REPLAYED_HEADER
+from app.core.cache import cache_stats
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.database import async_engine, async_read_replicas
+from app.core.static import CachedStaticFiles
+from app.core.auth import shutdown_password_hasher
+from app.services.avatars import shutdown_avatar_pool
+
+# 日志经队列由后台线程格式化输出，须在其他模块记录日志之前配置
+setup_logging()
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -20,17 +32,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", REPLAYED_HEADER],
 )
 
-# 配置静态文件服务
+# 请求延迟、并发数和每个请求的 SQL 语句数，由 /metrics 输出
+app.add_middleware(MetricsMiddleware)
+
+# 配置静态文件服务：内容哈希命名的文件（头像变体）可被客户端永久缓存
 static_dir = os.path.join(os.path.dirname(__file__), "static")
 if not os.path.exists(static_dir):
     os.makedirs(static_dir)
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
+app.mount("/static", CachedStaticFiles(directory=static_dir), name="static")
 
 # 注册API路由
 app.include_router(api_router, prefix="/api")
 
+# 关闭时释放异步连接池和密码哈希进程池
+@app.on_event("shutdown")
+async def shutdown_resources():
+    if async_engine is not None:
+        await async_engine.dispose()
+    for replica_engine in async_read_replicas.engines:
+        await replica_engine.dispose()
+    shutdown_password_hasher()
+    shutdown_avatar_pool()
+
 # 根路径
 @app.get("/")
 def read_root():
@@ -40,3 +66,13 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+# 进程内缓存命中统计
+@app.get("/health/caches")
+def health_caches():
+    return cache_stats()
+
+# Prometheus 文本格式的进程内指标
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
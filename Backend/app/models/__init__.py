@@ -1,9 +1,10 @@
 from app.models.user import User
 from app.models.family import Family, FamilyMember
-from app.models.transaction import TransactionEvent, MemberBalanceSnapshot
+from app.models.transaction import TransactionEvent, MemberBalanceSnapshot, MemberBalanceCheckpoint, MemberMonthlySpend
 from app.models.service import Service
 from app.models.task import BountyTask
 from app.models.reward import Reward
+from app.models.idempotency import IdempotencyKey
 
 __all__ = [
     "User",
@@ -11,7 +12,10 @@ __all__ = [
     "FamilyMember",
     "TransactionEvent",
     "MemberBalanceSnapshot",
+    "MemberBalanceCheckpoint",
+    "MemberMonthlySpend",
     "Service",
     "BountyTask",
-    "Reward"
+    "Reward",
+    "IdempotencyKey"
 ]
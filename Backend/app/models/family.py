@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, TIMESTAMP, ForeignKey, Numeric, UniqueConstraint
+from sqlalchemy import Column, String, TIMESTAMP, ForeignKey, Numeric, BigInteger, UniqueConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -16,6 +16,7 @@ class Family(Base):
     avatar_key = Column(String, nullable=True)
     created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    change_version = Column(BigInteger, nullable=False, default=0, server_default="0")  # 家庭内数据每次变更加一，用于 ETag
     
     # 关系
     creator = relationship("User", backref="created_families")
@@ -33,9 +34,10 @@ class FamilyMember(Base):
     monthly_quota = Column(Numeric(12, 2), default=0)
     joined_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     
-    # 唯一约束
+    # 唯一约束与索引
     __table_args__ = (
         UniqueConstraint('family_id', 'user_id', name='_family_user_uc'),
+        Index('ix_family_members_user_id', user_id),
     )
     
     # 关系
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, TIMESTAMP, ForeignKey, Integer, Index
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class IdempotencyKey(Base):
+    """幂等键表：客户端以 Idempotency-Key 重试写请求时，直接返回首次请求保存的响应"""
+    __tablename__ = "idempotency_keys"
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    # 接口与请求体的 SHA-256，同一个键用于不同请求时拒绝
+    fingerprint = Column(String(64), nullable=False)
+    # 与业务写入在同一事务中保存，提交前为空
+    status_code = Column(Integer, nullable=True)
+    response = Column(JSONB, nullable=True)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False)
+    
+    __table_args__ = (
+        Index('ix_idempotency_keys_expires_at', expires_at),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, TIMESTAMP, ForeignKey, Numeric, Text
+from sqlalchemy import Column, String, TIMESTAMP, ForeignKey, Numeric, Text, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -19,6 +19,13 @@ class Reward(Base):
     status = Column(String, default="pending")  # pending, approved, rejected
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     
+    # 索引（由迁移 306cca9815a2 创建）
+    __table_args__ = (
+        Index('ix_rewards_family_created', family_id, created_at.desc(), id.desc()),
+        Index('ix_rewards_family_pending', family_id, created_at.desc(), postgresql_where=(status == 'pending')),
+        Index('ix_rewards_member_created', member_id, created_at.desc(), id.desc()),
+    )
+    
     # 关系
     family = relationship("Family", backref="rewards")
     member = relationship("FamilyMember", backref="reward_applications")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, TIMESTAMP, ForeignKey, Numeric
+from sqlalchemy import Column, String, TIMESTAMP, ForeignKey, Numeric, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -19,6 +19,12 @@ class Service(Base):
     status = Column(String, default="active")
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     
+    # 索引（由迁移 306cca9815a2 创建）
+    __table_args__ = (
+        Index('ix_services_family_active', family_id, created_at.desc(), id.desc(), postgresql_where=(status == 'active')),
+        Index('ix_services_provider_active', provider_id, created_at.desc(), id.desc(), postgresql_where=(status == 'active')),
+    )
+    
     # 关系
     family = relationship("Family", backref="services")
     provider = relationship("FamilyMember", backref="provided_services")
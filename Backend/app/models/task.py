@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, TIMESTAMP, ForeignKey, Numeric
+from sqlalchemy import Column, String, TIMESTAMP, ForeignKey, Numeric, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -20,6 +20,14 @@ class BountyTask(Base):
     status = Column(String, default="open")  # open, in_progress, completed, cancelled
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     
+    # 索引（由迁移 306cca9815a2 创建）
+    __table_args__ = (
+        Index('ix_bounty_tasks_family_created', family_id, created_at.desc(), id.desc()),
+        Index('ix_bounty_tasks_family_open', family_id, created_at.desc(), postgresql_where=(status == 'open')),
+        Index('ix_bounty_tasks_created_by', created_by),
+        Index('ix_bounty_tasks_assigned_to', assigned_to),
+    )
+    
     # 关系
     family = relationship("Family", backref="bounty_tasks")
     creator = relationship("FamilyMember", foreign_keys=[created_by], backref="created_tasks")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, TIMESTAMP, ForeignKey, Numeric
+from sqlalchemy import Column, String, TIMESTAMP, Date, ForeignKey, Numeric, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -23,6 +23,13 @@ class TransactionEvent(Base):
     created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     
+    # 索引（由迁移 306cca9815a2 创建）
+    __table_args__ = (
+        Index('ix_transaction_events_family_created', family_id, created_at.desc(), id.desc()),
+        Index('ix_transaction_events_from_member_created', from_member_id, created_at.desc(), id.desc()),
+        Index('ix_transaction_events_to_member_created', to_member_id, created_at.desc(), id.desc()),
+    )
+    
     # 关系
     family = relationship("Family", backref="transactions")
     from_member = relationship("FamilyMember", foreign_keys=[from_member_id], backref="sent_transactions")
@@ -40,3 +47,24 @@ class MemberBalanceSnapshot(Base):
     
     # 关系
     member = relationship("FamilyMember", backref="balance_snapshot")
+
+
+class MemberBalanceCheckpoint(Base):
+    """余额检查点表：某一时刻家庭内各成员的余额，用于计算任意时间点的余额"""
+    __tablename__ = "member_balance_checkpoints"
+    
+    family_id = Column(UUID(as_uuid=True), ForeignKey("families.id", ondelete="CASCADE"), primary_key=True)
+    as_of = Column(TIMESTAMP(timezone=True), primary_key=True)  # 包含 created_at <= as_of 的全部已确认事件
+    member_id = Column(UUID(as_uuid=True), ForeignKey("family_members.id", ondelete="CASCADE"), primary_key=True)
+    balance = Column(Numeric(12, 2), nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+
+
+class MemberMonthlySpend(Base):
+    """成员月度支出计数表：与交易在同一事务中累加，用于校验月度额度"""
+    __tablename__ = "member_monthly_spend"
+    
+    member_id = Column(UUID(as_uuid=True), ForeignKey("family_members.id", ondelete="CASCADE"), primary_key=True)
+    month = Column(Date, primary_key=True)  # 当月第一天
+    spent = Column(Numeric(12, 2), nullable=False, default=0)
+    updated_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
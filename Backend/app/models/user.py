@@ -2,8 +2,8 @@ from sqlalchemy import Column, String, TIMESTAMP
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
-import hashlib
 
+from app.core.auth import get_password_hash, verify_password
 from app.core.database import Base
 
 
@@ -26,11 +26,8 @@ class User(Base):
     
     def set_password(self, password: str):
         """设置密码（存储哈希值）"""
-        # 简单的密码哈希，实际项目中应该使用更安全的哈希算法
-        self.password_hash = hashlib.sha256(password.encode()).hexdigest()
+        self.password_hash = get_password_hash(password)
     
     def check_password(self, password: str) -> bool:
         """验证密码"""
-        if not self.password_hash:
-            return False
-        return self.password_hash == hashlib.sha256(password.encode()).hexdigest()
+        return verify_password(password, self.password_hash)
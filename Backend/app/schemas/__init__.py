@@ -1,6 +1,7 @@
 from app.schemas.user import UserBase, UserCreate, UserUpdate, User
 from app.schemas.family import FamilyBase, FamilyCreate, FamilyUpdate, Family, FamilyMemberBase, FamilyMemberCreate, FamilyMemberUpdate, FamilyMember
-from app.schemas.transaction import TransactionEventBase, TransactionEventCreate, TransactionEvent, MemberBalanceSnapshot
+from app.schemas.transaction import TransactionEventBase, TransactionEventCreate, TransactionEvent, MemberBalanceSnapshot, TransactionBatchCreate, TransactionBatchItemResult, TransactionBatchResult, TransactionImportError, TransactionImportResult
+from app.schemas.ledger import BalanceDrift, FamilyReplayReport, MemberBalance, FamilyBalances
 from app.schemas.service import ServiceBase, ServiceCreate, ServiceUpdate, Service
 from app.schemas.task import BountyTaskBase, BountyTaskCreate, BountyTaskUpdate, BountyTask
 from app.schemas.reward import RewardBase, RewardCreate, RewardUpdate, Reward
@@ -12,6 +13,9 @@ __all__ = [
     "FamilyMemberBase", "FamilyMemberCreate", "FamilyMemberUpdate", "FamilyMember",
     "TransactionEventBase", "TransactionEventCreate", "TransactionEvent",
     "MemberBalanceSnapshot",
+    "TransactionBatchCreate", "TransactionBatchItemResult", "TransactionBatchResult",
+    "TransactionImportError", "TransactionImportResult",
+    "BalanceDrift", "FamilyReplayReport", "MemberBalance", "FamilyBalances",
     "ServiceBase", "ServiceCreate", "ServiceUpdate", "Service",
     "BountyTaskBase", "BountyTaskCreate", "BountyTaskUpdate", "BountyTask",
     "RewardBase", "RewardCreate", "RewardUpdate", "Reward",
@@ -55,6 +55,7 @@ class FamilyMember(FamilyMemberBase):
     family_id: UUID
     user_id: UUID
     joined_at: datetime
+    remaining_quota: Optional[Decimal] = None  # 当月剩余额度，不限额时为空
     
     class Config:
         from_attributes = True
@@ -0,0 +1,36 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+from uuid import UUID
+from decimal import Decimal
+
+
+class BalanceDrift(BaseModel):
+    """余额快照与事件重放结果不一致的成员"""
+    member_id: UUID
+    expected: Decimal  # 由交易事件重放得到的余额
+    actual: Optional[Decimal] = None  # 快照中的余额，无快照时为空
+
+
+class FamilyReplayReport(BaseModel):
+    """单个家庭的余额重放结果"""
+    family_id: UUID
+    events: int
+    members: int
+    drifts: List[BalanceDrift]
+    repaired: bool = False
+
+
+class MemberBalance(BaseModel):
+    """成员余额"""
+    member_id: UUID
+    balance: Decimal
+
+
+class FamilyBalances(BaseModel):
+    """家庭成员在某一时间点的余额"""
+    family_id: UUID
+    as_of: datetime
+    checkpoint_at: Optional[datetime] = None  # 计算所用的检查点时间，无检查点时从头累加
+    tail_events: int  # 检查点之后累加的事件数
+    balances: List[MemberBalance]
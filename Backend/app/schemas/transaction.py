@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List, Literal
 from datetime import datetime
 from uuid import UUID
 from decimal import Decimal
@@ -40,3 +40,39 @@ class MemberBalanceSnapshot(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+class TransactionBatchCreate(BaseModel):
+    """批量交易创建模型"""
+    items: List[TransactionEventCreate] = Field(..., min_length=1, max_length=1000)
+    # all_or_nothing: 任一条失败则全部回滚；best_effort: 提交所有校验通过的交易
+    mode: Literal["all_or_nothing", "best_effort"] = "all_or_nothing"
+
+
+class TransactionBatchItemResult(BaseModel):
+    """批量交易单条结果"""
+    index: int
+    status: Literal["created", "failed", "skipped"]  # skipped: 本条有效但整批已回滚
+    transaction: Optional[TransactionEvent] = None
+    error: Optional[str] = None
+
+
+class TransactionBatchResult(BaseModel):
+    """批量交易响应模型"""
+    committed: bool
+    created: int
+    failed: int
+    results: List[TransactionBatchItemResult]
+
+
+class TransactionImportError(BaseModel):
+    """CSV 导入中的错误行"""
+    line: int
+    error: str
+
+
+class TransactionImportResult(BaseModel):
+    """CSV 导入响应模型"""
+    committed: bool
+    imported: int
+    errors: List[TransactionImportError]
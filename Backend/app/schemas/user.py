@@ -1,8 +1,10 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, Optional
 from datetime import datetime
 from uuid import UUID
 
+from app.services.avatars import avatar_url, avatar_urls
+
 
 class UserBase(BaseModel):
     """用户基础模型"""
@@ -36,6 +38,7 @@ class User(UserBase):
     message: Optional[str] = "今天也要赚钱"  # 个性签名
     balance: int = 0  # 余额
     avatar: Optional[str] = None  # 头像URL
+    avatar_urls: Optional[Dict[str, Dict[str, str]]] = None  # 各尺寸头像URL
     phone: Optional[str] = None  # 手机号
     email: Optional[str] = None  # 邮箱
     role: Optional[str] = None  # 角色
@@ -55,7 +58,8 @@ class User(UserBase):
             'user_name': obj.user_name,  # 用户名
             'message': obj.message if obj.message else "今天也要赚钱",  # 使用数据库中的个性签名，否则使用默认值
             'balance': 0,  # 默认余额
-            'avatar': f"http://127.0.0.1:8000/static/avatars/{obj.avatar_key}" if obj.avatar_key else None,  # 处理头像字段
+            'avatar': avatar_url(obj.avatar_key),  # 处理头像字段
+            'avatar_urls': avatar_urls(obj.avatar_key),
             'phone': obj.phone,
             'email': obj.email,
             'role': obj.role
@@ -0,0 +1,131 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.core.config import settings
+
+# 头像变体的边长（像素）及格式；列表缩略图用 60，资料页用 120/240
+AVATAR_SIZES = (60, 120, 240)
+AVATAR_FORMATS = {"webp": "WEBP", "png": "PNG"}
+
+# 接受的源图格式与像素上限（防止解压炸弹）
+SOURCE_FORMATS = {"JPEG", "PNG", "GIF", "WEBP"}
+MAX_SOURCE_PIXELS = 4096 * 4096
+
+
+class InvalidImageError(Exception):
+    """上传的文件不是可处理的图片"""
+    pass
+
+
+def variant_name(key: str, size: int, ext: str) -> str:
+    return f"{key}_{size}.{ext}"
+
+
+def _content_key(path: str) -> str:
+    """源文件内容的 SHA-256，相同图片得到相同的键"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+
+def _write_atomic(image: Image.Image, path: str, fmt: str) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".variant-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            image.save(f, fmt, **({"quality": 85, "method": 4} if fmt == "WEBP" else {"optimize": True}))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def build_variants(source_path: str, directory: str) -> str:
+    """在工作进程中执行：校验源图，生成各尺寸的 WebP/PNG 变体，返回内容键
+
+    文件名由内容键决定，内容不变则 URL 不变，可以永久缓存；变体已存在时（相同图片
+    重复上传）不再重新生成。每个变体先写临时文件再原子重命名。源文件总会被删除。
+    """
+    try:
+        key = _content_key(source_path)
+        names = [variant_name(key, size, ext) for size in AVATAR_SIZES for ext in AVATAR_FORMATS]
+        if all(os.path.exists(os.path.join(directory, name)) for name in names):
+            return key
+
+        try:
+            with Image.open(source_path) as image:
+                if image.format not in SOURCE_FORMATS:
+                    raise InvalidImageError(f"Unsupported image format: {image.format}")
+                if image.width * image.height > MAX_SOURCE_PIXELS:
+                    raise InvalidImageError("Image dimensions too large")
+                # 按 EXIF 方向摆正，GIF 只取第一帧
+                image = ImageOps.exif_transpose(image)
+                image = image.convert("RGBA")
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+            raise InvalidImageError(str(e))
+
+        # 居中裁剪为正方形后从大到小缩放
+        for size in sorted(AVATAR_SIZES, reverse=True):
+            image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            for ext, fmt in AVATAR_FORMATS.items():
+                _write_atomic(image, os.path.join(directory, variant_name(key, size, ext)), fmt)
+        return key
+    finally:
+        if os.path.exists(source_path):
+            os.remove(source_path)
+
+
+# 图片解码和缩放是 CPU 密集型计算，放到独立进程池中执行，与密码哈希相同
+_avatar_executor: Optional[ProcessPoolExecutor] = None
+_avatar_semaphore: Optional[asyncio.Semaphore] = None
+
+
+async def build_variants_async(source_path: str, directory: str) -> str:
+    """在进程池中生成头像变体"""
+    global _avatar_executor, _avatar_semaphore
+    if _avatar_executor is None:
+        _avatar_executor = ProcessPoolExecutor(max_workers=settings.avatar_workers)
+        _avatar_semaphore = asyncio.Semaphore(settings.avatar_workers * 2)
+    async with _avatar_semaphore:
+        return await asyncio.get_running_loop().run_in_executor(
+            _avatar_executor, build_variants, source_path, directory
+        )
+
+
+def shutdown_avatar_pool() -> None:
+    """关闭头像处理进程池"""
+    global _avatar_executor
+    if _avatar_executor is not None:
+        _avatar_executor.shutdown(wait=False, cancel_futures=True)
+        _avatar_executor = None
+
+
+def avatar_urls(avatar_key: Optional[str]) -> Optional[Dict[str, Dict[str, str]]]:
+    """各尺寸头像地址：{"60": {"webp": ..., "png": ...}, ...}
+
+    早期上传的头像以 {user_id}{ext} 保存原图，没有变体，所有尺寸都指向原图。
+    """
+    if not avatar_key:
+        return None
+    base = f"{settings.public_base_url}/static/avatars"
+    if "." in avatar_key:
+        url = f"{base}/{avatar_key}"
+        return {str(size): {ext: url for ext in AVATAR_FORMATS} for size in AVATAR_SIZES}
+    return {
+        str(size): {ext: f"{base}/{variant_name(avatar_key, size, ext)}" for ext in AVATAR_FORMATS}
+        for size in AVATAR_SIZES
+    }
+
+
+def avatar_url(avatar_key: Optional[str], size: int = max(AVATAR_SIZES), ext: str = "png") -> Optional[str]:
+    """单个头像地址，默认最大尺寸的 PNG（兼容只读取 avatar 字段的客户端）"""
+    urls = avatar_urls(avatar_key)
+    return urls[str(size)][ext] if urls else None
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.family import FamilyMember
+from app.models.transaction import TransactionEvent, MemberBalanceCheckpoint
+from app.schemas.ledger import FamilyBalances, MemberBalance
+from app.services.ledger import transfer_deltas
+
+# 事件的 created_at 取自写入事务的开始时间，未提交的长事务可能在稍后才出现早于当前时间的事件，
+# 因此检查点时间至少要早于当前时间这么久
+CHECKPOINT_GRACE = timedelta(minutes=10)
+
+
+def _as_utc(value: datetime) -> datetime:
+    """未带时区的时间按 UTC 处理"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def balances_as_of(db: Session, family_id: UUID, as_of: datetime) -> FamilyBalances:
+    """计算家庭成员在 as_of 时刻的余额
+
+    取 as_of 之前最近的检查点，再在数据库内聚合检查点之后到 as_of 的事件，
+    查询代价只与检查点间隔内的事件数有关，与历史总量无关。
+    """
+    as_of = _as_utc(as_of)
+    checkpoint_at = db.scalar(
+        select(func.max(MemberBalanceCheckpoint.as_of)).where(
+            MemberBalanceCheckpoint.family_id == family_id,
+            MemberBalanceCheckpoint.as_of <= as_of
+        )
+    )
+
+    balances: Dict[UUID, Decimal] = {
+        member_id: Decimal(0)
+        for member_id in db.scalars(select(FamilyMember.id).where(FamilyMember.family_id == family_id))
+    }
+    if checkpoint_at is not None:
+        for row in db.execute(
+            select(MemberBalanceCheckpoint.member_id, MemberBalanceCheckpoint.balance).where(
+                MemberBalanceCheckpoint.family_id == family_id,
+                MemberBalanceCheckpoint.as_of == checkpoint_at
+            )
+        ):
+            balances[row.member_id] = row.balance
+
+    # 检查点之后的事件按交易双方聚合，只返回少量分组
+    tail = select(
+        TransactionEvent.from_member_id,
+        TransactionEvent.to_member_id,
+        func.sum(TransactionEvent.amount).label("amount"),
+        func.count().label("events")
+    ).where(
+        TransactionEvent.family_id == family_id,
+        TransactionEvent.status == "confirmed",
+        TransactionEvent.created_at <= as_of
+    ).group_by(TransactionEvent.from_member_id, TransactionEvent.to_member_id)
+    if checkpoint_at is not None:
+        tail = tail.where(TransactionEvent.created_at > checkpoint_at)
+
+    tail_events = 0
+    for row in db.execute(tail):
+        for member_id, delta in transfer_deltas(row.from_member_id, row.to_member_id, row.amount).items():
+            balances[member_id] = balances.get(member_id, Decimal(0)) + delta
+        tail_events += row.events
+
+    return FamilyBalances(
+        family_id=family_id,
+        as_of=as_of,
+        checkpoint_at=checkpoint_at,
+        tail_events=tail_events,
+        balances=[MemberBalance(member_id=m, balance=balances[m]) for m in sorted(balances)],
+    )
+
+
+def write_checkpoint(db: Session, family_id: UUID, as_of: datetime, min_events: int = 1) -> bool:
+    """为家庭写入 as_of 时刻的余额检查点，不提交事务
+
+    距上一个检查点不足 min_events 个事件时跳过。返回是否写入。
+    """
+    as_of = _as_utc(as_of)
+    if as_of > datetime.now(timezone.utc) - CHECKPOINT_GRACE:
+        raise ValueError(f"Checkpoint time must be at least {CHECKPOINT_GRACE} in the past")
+
+    result = balances_as_of(db, family_id, as_of)
+    if result.checkpoint_at == as_of or result.tail_events < max(min_events, 1):
+        return False
+
+    db.execute(
+        pg_insert(MemberBalanceCheckpoint).values([
+            {"family_id": family_id, "as_of": as_of, "member_id": b.member_id, "balance": b.balance}
+            for b in result.balances
+        ]).on_conflict_do_nothing()
+    )
+    return True
@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+import zlib
+from typing import Dict, Iterable, Iterator
+from uuid import UUID
+
+from sqlalchemy import select
+
+from app.core.database import engine
+from app.models.transaction import TransactionEvent
+
+# 每批从服务端游标读取的行数，同时也是输出的分块大小
+EXPORT_BATCH_SIZE = 2000
+
+EXPORT_COLUMNS = [
+    TransactionEvent.id,
+    TransactionEvent.created_at,
+    TransactionEvent.event_type,
+    TransactionEvent.amount,
+    TransactionEvent.from_member_id,
+    TransactionEvent.to_member_id,
+    TransactionEvent.reference_id,
+    TransactionEvent.description,
+    TransactionEvent.status,
+    TransactionEvent.created_by,
+]
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _text(value) -> str:
+    """UUID、Decimal、时间统一转为字符串，空值为空串"""
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_chunk(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_text(v) for v in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _ndjson_chunk(rows) -> bytes:
+    return "".join(
+        json.dumps(
+            {field: (None if value is None else _text(value)) for field, value in zip(EXPORT_FIELDS, row)},
+            ensure_ascii=False
+        ) + "\n"
+        for row in rows
+    ).encode("utf-8")
+
+
+def stream_transactions(family_id: UUID, fmt: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """按 created_at 顺序逐批输出家庭的全部交易事件
+
+    使用独立连接和服务端游标读取 Core 行元组，每次只在内存中保留一批，
+    与家庭的交易总量无关。请求的数据库会话在响应开始前就已关闭，因此不能复用。
+    """
+    stmt = (
+        select(*EXPORT_COLUMNS)
+        .where(TransactionEvent.family_id == family_id)
+        .order_by(TransactionEvent.created_at, TransactionEvent.id)
+    )
+    encode = _csv_chunk if fmt == "csv" else _ndjson_chunk
+    with engine.connect() as conn:
+        if fmt == "csv":
+            yield _csv_chunk([EXPORT_FIELDS])
+        result = conn.execution_options(yield_per=batch_size).execute(stmt)
+        for rows in result.partitions():
+            yield encode(rows)
+
+
+def _encoding_qvalues(accept_encoding: str) -> Dict[str, float]:
+    """解析 Accept-Encoding，返回 编码 -> q 值；未写 q 时为 1，q 无法解析时视为 0"""
+    qvalues = {}
+    for item in accept_encoding.split(","):
+        name, *params = [part.strip() for part in item.split(";")]
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qvalues[name.lower()] = q
+    return qvalues
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """客户端是否接受 gzip：显式列出 gzip 时按其 q 值，否则按 * 的 q 值，q 为 0 表示不接受"""
+    qvalues = _encoding_qvalues(accept_encoding)
+    return qvalues.get("gzip", qvalues.get("*", 0.0)) > 0
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """边生成边压缩为 gzip 格式"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,133 @@
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import UUID
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+from sqlalchemy import delete, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.idempotency import IdempotencyKey
+
+# 客户端重试写请求时携带的请求头，同一用户的同一个键只执行一次
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+# 响应来自首次请求保存的结果时附加该响应头
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# 幂等处理流程（在业务事务内）：
+#   1. 按 (user_id, key) 主键查询已保存的响应，命中则直接返回，不再校验和写入余额；
+#   2. 未命中时先插入幂等键占位，并发的相同请求会在唯一索引上等待前一个事务结束；
+#   3. 业务写入完成后在同一事务中保存响应，与交易一起提交。业务失败回滚时占位随之撤销，
+#      客户端可以用同一个键重试。
+
+
+def fingerprint(scope: str, payload: BaseModel) -> str:
+    """接口与请求体的摘要，键名排序后计算，与字段顺序无关"""
+    body = json.dumps(payload.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{scope}\n{body}".encode()).hexdigest()
+
+
+def _stored_response(db: Session, user_id: UUID, key: str, digest: str) -> Optional[dict]:
+    row = db.execute(
+        select(IdempotencyKey.fingerprint, IdempotencyKey.response).where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.expires_at > func.now()
+        )
+    ).first()
+    if row is None:
+        return None
+    if row.fingerprint != digest:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request"
+        )
+    if row.response is None:
+        # 占位与响应在同一事务中提交，正常情况下不会读到空响应
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is in progress"
+        )
+    return row.response
+
+
+def replay_or_claim(
+    db: Session,
+    user_id: UUID,
+    key: Optional[str],
+    digest: str,
+    response: Optional[Response] = None
+) -> Optional[dict]:
+    """返回该键已保存的响应；没有时在当前事务中占用该键并返回 None
+
+    须在业务事务的第一条写入之前调用。key 为空时不做幂等处理。
+    """
+    if key is None:
+        return None
+
+    stored = _stored_response(db, user_id, key, digest)
+    if stored is None:
+        now = datetime.now(timezone.utc)
+        stmt = pg_insert(IdempotencyKey).values(
+            user_id=user_id,
+            key=key,
+            fingerprint=digest,
+            expires_at=now + timedelta(hours=settings.idempotency_key_ttl_hours)
+        )
+        # 已过期的记录视为不存在，直接覆盖
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+            set_={
+                "fingerprint": stmt.excluded.fingerprint,
+                "status_code": None,
+                "response": None,
+                "created_at": func.now(),
+                "expires_at": stmt.excluded.expires_at,
+            },
+            where=IdempotencyKey.expires_at <= func.now()
+        ).returning(IdempotencyKey.key)
+        if db.execute(stmt).first() is not None:
+            return None
+        # 并发的相同请求已先提交（插入在唯一索引上等待其事务结束），读取它保存的响应
+        db.rollback()
+        stored = _stored_response(db, user_id, key, digest)
+        if stored is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is in progress"
+            )
+
+    if response is not None:
+        response.headers[REPLAYED_HEADER] = "true"
+    return stored
+
+
+def save_response(db: Session, user_id: UUID, key: Optional[str], result: BaseModel) -> None:
+    """在业务事务提交之前保存响应"""
+    if key is None:
+        return
+    db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        .values(status_code=status.HTTP_200_OK, response=result.model_dump(mode="json"))
+    )
+
+
+def purge_expired(db: Session, batch_size: int = 10000) -> int:
+    """删除一批过期的幂等键，返回删除的行数"""
+    expired = (
+        select(IdempotencyKey.user_id, IdempotencyKey.key)
+        .where(IdempotencyKey.expires_at <= func.now())
+        .limit(batch_size)
+    )
+    result = db.execute(
+        delete(IdempotencyKey).where(
+            tuple_(IdempotencyKey.user_id, IdempotencyKey.key).in_(expired)
+        )
+    )
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,204 @@
+import csv
+import tempfile
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.etag import commit_and_bump_version
+from app.models.family import FamilyMember
+from app.models.transaction import TransactionEvent, MemberBalanceCheckpoint
+from app.models.user import User
+from app.schemas.transaction import TransactionImportError, TransactionImportResult
+from app.services.ledger import current_month, rebuild_spend
+from app.services.replay import rebuild_family_balances
+
+# 写入 transaction_events 的列，顺序与 COPY 的列清单一致
+COPY_COLUMNS = [
+    "id", "family_id", "event_type", "amount", "from_member_id", "to_member_id",
+    "reference_id", "description", "status", "created_by", "created_at",
+]
+
+# 错误达到该数量后停止解析
+MAX_IMPORT_ERRORS = 100
+
+# transaction_events.amount 为 Numeric(12, 2)
+AMOUNT_STEP = Decimal("0.01")
+MAX_AMOUNT = Decimal("1e10")
+
+# 可导入的交易状态；余额重放、检查点和支出统计只计入 confirmed
+IMPORT_STATUSES = ("confirmed", "pending", "cancelled")
+
+# 无 COPY 时回退为多行 INSERT 的每批行数
+INSERT_BATCH_SIZE = 1000
+
+
+def member_map(db: Session, family_id: UUID) -> Dict[str, UUID]:
+    """家庭成员引用表：成员ID、用户名、昵称均可引用成员，昵称重名时不能用昵称引用"""
+    refs: Dict[str, Optional[UUID]] = {}
+    rows = db.query(FamilyMember.id, User.user_name, User.nickname).join(
+        User, User.id == FamilyMember.user_id
+    ).filter(FamilyMember.family_id == family_id).all()
+    for row in rows:
+        for key in (row.user_name, row.nickname):
+            if key:
+                refs[key] = None if key in refs and refs[key] != row.id else row.id
+    for row in rows:
+        refs[str(row.id)] = row.id
+    return {key: member_id for key, member_id in refs.items() if member_id}
+
+
+def _parse_row(row: dict, members: Dict[str, UUID], tz: ZoneInfo, now: datetime) -> list:
+    """校验并规范化一行，返回 COPY_COLUMNS 中 id、family_id、created_by 之外的值"""
+    event_type = (row.get("event_type") or "").strip()
+    if not event_type:
+        raise ValueError("event_type is required")
+
+    try:
+        amount = Decimal((row.get("amount") or "").strip())
+    except InvalidOperation:
+        raise ValueError("Invalid amount")
+    if not amount.is_finite() or amount <= 0:
+        raise ValueError("Amount must be positive")
+    # 与 Numeric(12, 2) 一致：不能超过两位小数（否则会被静默舍入），整数部分不超过 10 位
+    if amount != amount.quantize(AMOUNT_STEP):
+        raise ValueError("Amount must have at most 2 decimal places")
+    if amount >= MAX_AMOUNT:
+        raise ValueError("Amount is too large")
+
+    parties = []
+    for field in ("from_member", "to_member"):
+        ref = (row.get(field) or row.get(f"{field}_id") or "").strip()
+        if ref and ref not in members:
+            raise ValueError(f"Unknown {field.replace('_', ' ')}: {ref}")
+        parties.append(members[ref] if ref else None)
+    if not any(parties):
+        raise ValueError("from_member or to_member is required")
+
+    reference_id = (row.get("reference_id") or "").strip() or None
+    if reference_id:
+        try:
+            reference_id = UUID(reference_id)
+        except ValueError:
+            raise ValueError("Invalid reference_id")
+
+    created_at = (row.get("created_at") or "").strip()
+    if created_at:
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except ValueError:
+            raise ValueError("Invalid created_at")
+        # 表格中的时间通常是本地时间
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=tz)
+    else:
+        created_at = now
+
+    status = (row.get("status") or "").strip().lower() or "confirmed"
+    if status not in IMPORT_STATUSES:
+        raise ValueError(f"Invalid status: {status} (expected one of {', '.join(IMPORT_STATUSES)})")
+    description = (row.get("description") or "").strip() or None
+    return [event_type, amount, parties[0], parties[1], reference_id, description, status, created_at]
+
+
+def _copy_rows(db: Session, spool) -> bool:
+    """使用 PostgreSQL COPY 写入，驱动不支持时返回 False"""
+    dbapi_connection = db.connection().connection.dbapi_connection
+    cursor = dbapi_connection.cursor()
+    if not hasattr(cursor, "copy_expert"):
+        return False
+    try:
+        cursor.copy_expert(
+            f"COPY transaction_events ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            spool
+        )
+    finally:
+        cursor.close()
+    return True
+
+
+# 临时文件中的文本还原为列类型
+_FROM_TEXT = {
+    "id": UUID, "family_id": UUID, "from_member_id": UUID, "to_member_id": UUID,
+    "reference_id": UUID, "created_by": UUID, "amount": Decimal, "created_at": datetime.fromisoformat,
+}
+
+
+def _insert_rows(db: Session, spool) -> None:
+    """回退方案：分批多行 INSERT"""
+    batch = []
+    for values in csv.reader(spool):
+        batch.append({
+            column: (_FROM_TEXT.get(column, str)(value) if value != "" else None)
+            for column, value in zip(COPY_COLUMNS, values)
+        })
+        if len(batch) >= INSERT_BATCH_SIZE:
+            db.execute(insert(TransactionEvent), batch)
+            batch = []
+    if batch:
+        db.execute(insert(TransactionEvent), batch)
+
+
+def import_transactions(db: Session, family_id: UUID, user_id: UUID, lines: Iterable[str]) -> TransactionImportResult:
+    """从 CSV 文本流批量导入家庭的历史交易
+
+    CSV 表头需包含 event_type、amount 以及 from_member / to_member（可填成员ID、用户名或昵称），
+    可选 created_at、description、reference_id、status（IMPORT_STATUSES 之一，不区分大小写，
+    默认 confirmed）。逐行解析校验并写入临时文件（超过内存阈值后落盘），全部通过后以 COPY
+    一次载入，再重建余额快照和当月支出计数，最后提交。任一行有误时不导入任何数据。
+    导入的是历史记录，不校验余额和月度额度。
+    """
+    members = member_map(db, family_id)
+    tz = ZoneInfo(settings.quota_timezone)
+    now = datetime.now(timezone.utc)
+    errors: List[TransactionImportError] = []
+    imported = 0
+    earliest = None
+
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024, mode="w+", newline="") as spool:
+        writer = csv.writer(spool)
+        reader = csv.DictReader(lines)
+        try:
+            for row in reader:
+                try:
+                    values = _parse_row(row, members, tz, now)
+                except ValueError as e:
+                    errors.append(TransactionImportError(line=reader.line_num, error=str(e)))
+                    if len(errors) >= MAX_IMPORT_ERRORS:
+                        break
+                    continue
+                created_at = values[-1]
+                earliest = created_at if earliest is None or created_at < earliest else earliest
+                writer.writerow([uuid.uuid4(), family_id, *values[:-1], user_id, created_at])
+                imported += 1
+        except UnicodeDecodeError:
+            # 文本流按块解码，出错的位置只能精确到正在读取的行附近
+            errors.append(TransactionImportError(
+                line=reader.line_num + 1,
+                error="File is not valid UTF-8 text; save the CSV with UTF-8 encoding"
+            ))
+
+        if errors or not imported:
+            return TransactionImportResult(committed=False, imported=0, errors=errors)
+
+        spool.seek(0)
+        if not _copy_rows(db, spool):
+            spool.seek(0)
+            _insert_rows(db, spool)
+
+    # 导入的历史早于已有检查点时，这些检查点不再准确
+    db.execute(delete(MemberBalanceCheckpoint).where(
+        MemberBalanceCheckpoint.family_id == family_id,
+        MemberBalanceCheckpoint.as_of >= earliest
+    ))
+    rebuild_family_balances(db, family_id)
+    rebuild_spend(db, set(members.values()), current_month())
+    commit_and_bump_version(db, family_id)
+
+    return TransactionImportResult(committed=True, imported=imported, errors=[])
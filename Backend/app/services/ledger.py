@@ -0,0 +1,232 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import case, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.models.transaction import TransactionEvent, MemberBalanceSnapshot, MemberMonthlySpend
+
+
+class InsufficientBalanceError(Exception):
+    """余额不足"""
+
+    def __init__(self, member_ids: Iterable[UUID]):
+        self.member_ids = sorted(member_ids)
+        super().__init__(f"Insufficient balance for members: {', '.join(str(m) for m in self.member_ids)}")
+
+
+class QuotaExceededError(Exception):
+    """超出月度额度"""
+
+    def __init__(self, member_ids: Iterable[UUID]):
+        self.member_ids = sorted(member_ids)
+        super().__init__(f"Monthly quota exceeded for members: {', '.join(str(m) for m in self.member_ids)}")
+
+
+def transfer_deltas(from_member_id, to_member_id, amount) -> Dict[UUID, Decimal]:
+    """将一笔交易拆分为各成员的余额变动"""
+    deltas: Dict[UUID, Decimal] = {}
+    if from_member_id:
+        deltas[from_member_id] = deltas.get(from_member_id, Decimal(0)) - amount
+    if to_member_id:
+        deltas[to_member_id] = deltas.get(to_member_id, Decimal(0)) + amount
+    return deltas
+
+
+def apply_balance_deltas(db: Session, deltas: Dict[UUID, Decimal]) -> Dict[UUID, Decimal]:
+    """在当前数据库事务中原子地应用余额变动
+
+    所有成员的变动合并为一条 INSERT ... ON CONFLICT DO UPDATE 语句，
+    余额在数据库内做加减，不存在读-改-写的丢失更新。
+    扣款条件（余额不能透支）写在 ON CONFLICT 的 WHERE 中，条件不满足的行不会被更新，
+    也不会出现在 RETURNING 结果里，此时抛出 InsufficientBalanceError，由调用方回滚事务。
+
+    VALUES 按 member_id 排序，保证并发事务以相同顺序加行锁，避免死锁。
+    尚无快照的成员沿用原有语义：直接以变动值创建快照，不做余额校验。
+
+    返回各成员变动后的余额。
+    """
+    deltas = {member_id: delta for member_id, delta in deltas.items() if delta}
+    if not deltas:
+        return {}
+
+    table = MemberBalanceSnapshot.__table__
+    stmt = pg_insert(table).values([
+        {"member_id": member_id, "balance": deltas[member_id]}
+        for member_id in sorted(deltas)
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.member_id],
+        set_={
+            "balance": table.c.balance + stmt.excluded.balance,
+            "updated_at": func.now(),
+        },
+        # 入账总是允许；扣款要求扣后余额不为负
+        where=or_(stmt.excluded.balance >= 0, table.c.balance + stmt.excluded.balance >= 0),
+    ).returning(table.c.member_id, table.c.balance)
+
+    balances = {row.member_id: row.balance for row in db.execute(stmt)}
+    missing = set(deltas) - set(balances)
+    if missing:
+        raise InsufficientBalanceError(missing)
+    return balances
+
+
+def set_balances(db: Session, balances: Dict[UUID, Decimal]) -> None:
+    """将成员余额快照直接设置为给定值（用于重放修复），不存在的快照会被创建"""
+    if not balances:
+        return
+    table = MemberBalanceSnapshot.__table__
+    stmt = pg_insert(table).values([
+        {"member_id": member_id, "balance": balances[member_id]}
+        for member_id in sorted(balances)
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.member_id],
+        set_={"balance": stmt.excluded.balance, "updated_at": func.now()},
+    )
+    db.execute(stmt)
+
+
+def lock_balances(db: Session, member_ids: Iterable[UUID]) -> Dict[UUID, Decimal]:
+    """按 member_id 顺序锁定并读取成员余额快照（SELECT ... FOR UPDATE）
+
+    无快照的成员不会出现在返回结果中。
+    """
+    member_ids = sorted(set(member_ids))
+    if not member_ids:
+        return {}
+    stmt = (
+        select(MemberBalanceSnapshot.member_id, MemberBalanceSnapshot.balance)
+        .where(MemberBalanceSnapshot.member_id.in_(member_ids))
+        .order_by(MemberBalanceSnapshot.member_id)
+        .with_for_update()
+    )
+    return {row.member_id: row.balance for row in db.execute(stmt)}
+
+
+def current_month() -> date:
+    """按 quota_timezone 计算的当月第一天"""
+    return datetime.now(ZoneInfo(settings.quota_timezone)).date().replace(day=1)
+
+
+def month_start(month: date) -> datetime:
+    """月份第一天零点（quota_timezone）"""
+    return datetime.combine(month, time(), ZoneInfo(settings.quota_timezone))
+
+
+def has_quota(quota: Optional[Decimal]) -> bool:
+    """月度额度为 0 或空表示不限额"""
+    return bool(quota) and quota > 0
+
+
+def apply_spend(db: Session, spends: Dict[UUID, Decimal], quotas: Dict[UUID, Optional[Decimal]], month: date) -> None:
+    """在当前数据库事务中累加成员当月支出，并校验月度额度
+
+    与 apply_balance_deltas 相同，使用一条 INSERT ... ON CONFLICT DO UPDATE，
+    额度条件写在 WHERE 中，累加后超出额度的成员不会出现在 RETURNING 结果里，
+    此时抛出 QuotaExceededError，由调用方回滚事务。校验只读写一行计数，与历史交易数无关。
+
+    quotas 为各成员的月度额度，不限额的成员照常累加支出但不做校验。
+    """
+    spends = {member_id: amount for member_id, amount in spends.items() if amount > 0}
+    if not spends:
+        return
+
+    limits = {member_id: quotas[member_id] for member_id in spends if has_quota(quotas.get(member_id))}
+    # 当月第一笔支出走 INSERT 分支，不经过 WHERE，需要先单独校验
+    over = {member_id for member_id, limit in limits.items() if spends[member_id] > limit}
+    if over:
+        raise QuotaExceededError(over)
+
+    table = MemberMonthlySpend.__table__
+    stmt = pg_insert(table).values([
+        {"member_id": member_id, "month": month, "spent": spends[member_id]}
+        for member_id in sorted(spends)
+    ])
+    where = None
+    if limits:
+        where = or_(
+            table.c.member_id.notin_(list(limits)),
+            table.c.spent + stmt.excluded.spent <= case(limits, value=table.c.member_id)
+        )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.member_id, table.c.month],
+        set_={
+            "spent": table.c.spent + stmt.excluded.spent,
+            "updated_at": func.now(),
+        },
+        where=where,
+    ).returning(table.c.member_id)
+
+    updated = set(db.scalars(stmt))
+    missing = set(spends) - updated
+    if missing:
+        raise QuotaExceededError(missing)
+
+
+def remaining_quotas(db: Session, quotas: Dict[UUID, Optional[Decimal]], month: date) -> Dict[UUID, Optional[Decimal]]:
+    """成员当月剩余额度，不限额的成员为 None"""
+    limited = [member_id for member_id, quota in quotas.items() if has_quota(quota)]
+    spent = {}
+    if limited:
+        spent = dict(db.execute(
+            select(MemberMonthlySpend.member_id, MemberMonthlySpend.spent)
+            .where(MemberMonthlySpend.member_id.in_(limited), MemberMonthlySpend.month == month)
+        ).all())
+    return {
+        member_id: max(quota - spent.get(member_id, Decimal(0)), Decimal(0)) if has_quota(quota) else None
+        for member_id, quota in quotas.items()
+    }
+
+
+def lock_spend(db: Session, member_ids: Iterable[UUID], month: date) -> Dict[UUID, Decimal]:
+    """按 member_id 顺序锁定并读取成员当月支出（SELECT ... FOR UPDATE）
+
+    当月尚无支出的成员不会出现在返回结果中。
+    """
+    member_ids = sorted(set(member_ids))
+    if not member_ids:
+        return {}
+    stmt = (
+        select(MemberMonthlySpend.member_id, MemberMonthlySpend.spent)
+        .where(MemberMonthlySpend.member_id.in_(member_ids), MemberMonthlySpend.month == month)
+        .order_by(MemberMonthlySpend.member_id)
+        .with_for_update()
+    )
+    return {row.member_id: row.spent for row in db.execute(stmt)}
+
+
+def rebuild_spend(db: Session, member_ids: Iterable[UUID], month: date) -> None:
+    """在当前事务中由交易事件重新计算成员当月支出，不提交（用于批量导入之后）"""
+    member_ids = sorted(set(member_ids))
+    if not member_ids:
+        return
+    lock_spend(db, member_ids, month)
+    spent = dict(db.execute(
+        select(TransactionEvent.from_member_id, func.sum(TransactionEvent.amount))
+        .where(
+            TransactionEvent.from_member_id.in_(member_ids),
+            TransactionEvent.status == "confirmed",
+            TransactionEvent.created_at >= month_start(month),
+            TransactionEvent.created_at < month_start((month.replace(day=28) + timedelta(days=4)).replace(day=1))
+        )
+        .group_by(TransactionEvent.from_member_id)
+    ).all())
+
+    table = MemberMonthlySpend.__table__
+    stmt = pg_insert(table).values([
+        {"member_id": member_id, "month": month, "spent": spent.get(member_id, Decimal(0))}
+        for member_id in member_ids
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.member_id, table.c.month],
+        set_={"spent": stmt.excluded.spent, "updated_at": func.now()},
+    )
+    db.execute(stmt)
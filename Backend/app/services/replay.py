@@ -0,0 +1,110 @@
+from decimal import Decimal
+from typing import Dict, Tuple
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.family import FamilyMember
+from app.models.transaction import TransactionEvent, MemberBalanceSnapshot
+from app.schemas.ledger import BalanceDrift, FamilyReplayReport
+from app.services.ledger import lock_balances, set_balances, transfer_deltas
+
+# 每批从服务端游标读取的事件数
+REPLAY_BATCH_SIZE = 5000
+
+
+def replay_events(db: Session, family_id: UUID, batch_size: int = REPLAY_BATCH_SIZE) -> Tuple[Dict[UUID, Decimal], int]:
+    """按 created_at 顺序重放家庭的已确认交易事件，返回 (各成员余额, 事件数)
+
+    事件通过服务端游标分批读取，内存占用只与成员数有关，与事件数无关。
+    """
+    stmt = (
+        select(TransactionEvent.from_member_id, TransactionEvent.to_member_id, TransactionEvent.amount)
+        .where(TransactionEvent.family_id == family_id, TransactionEvent.status == "confirmed")
+        .order_by(TransactionEvent.created_at, TransactionEvent.id)
+        .execution_options(yield_per=batch_size)
+    )
+    balances: Dict[UUID, Decimal] = {}
+    count = 0
+    for row in db.execute(stmt):
+        for member_id, delta in transfer_deltas(row.from_member_id, row.to_member_id, row.amount).items():
+            balances[member_id] = balances.get(member_id, Decimal(0)) + delta
+        count += 1
+    return balances, count
+
+
+def replay_family(db: Session, family_id: UUID, repair: bool = False) -> FamilyReplayReport:
+    """由交易事件重新计算家庭成员余额，与余额快照比对，可选修复快照
+
+    只校验时使用只读的 REPEATABLE READ 事务，事件和快照来自同一个数据库快照；
+    修复时先锁定该家庭的现有快照行，阻塞并发的记账，再重放并写回，最后提交。
+    """
+    # 结束会话中已有的事务（如权限校验查询），保证下面的设置作用于新事务
+    db.rollback()
+    if not repair:
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ", "postgresql_readonly": True})
+
+    member_ids = list(db.scalars(select(FamilyMember.id).where(FamilyMember.family_id == family_id)))
+    if repair:
+        snapshots = lock_balances(db, member_ids)
+    else:
+        snapshots = {
+            row.member_id: row.balance
+            for row in db.execute(
+                select(MemberBalanceSnapshot.member_id, MemberBalanceSnapshot.balance)
+                .where(MemberBalanceSnapshot.member_id.in_(member_ids))
+            )
+        }
+
+    expected, events = replay_events(db, family_id)
+
+    drifts = []
+    for member_id in sorted(set(member_ids) | set(expected)):
+        balance = expected.get(member_id, Decimal(0))
+        actual = snapshots.get(member_id)
+        # 没有快照且重放余额为 0 的成员视为一致
+        if (actual if actual is not None else Decimal(0)) != balance:
+            drifts.append(BalanceDrift(member_id=member_id, expected=balance, actual=actual))
+
+    if repair and drifts:
+        set_balances(db, {drift.member_id: drift.expected for drift in drifts})
+        db.commit()
+    else:
+        db.rollback()
+
+    return FamilyReplayReport(
+        family_id=family_id,
+        events=events,
+        members=len(member_ids),
+        drifts=drifts,
+        repaired=repair and bool(drifts),
+    )
+
+
+def rebuild_family_balances(db: Session, family_id: UUID) -> Dict[UUID, Decimal]:
+    """在当前事务中由全部已确认事件重新计算家庭成员的余额快照，不提交
+
+    先锁定现有快照行，再在数据库内按交易双方聚合事件，一次写回所有成员的余额。
+    用于批量导入历史交易之后。
+    """
+    member_ids = list(db.scalars(select(FamilyMember.id).where(FamilyMember.family_id == family_id)))
+    lock_balances(db, member_ids)
+
+    balances: Dict[UUID, Decimal] = {member_id: Decimal(0) for member_id in member_ids}
+    totals = db.execute(
+        select(
+            TransactionEvent.from_member_id,
+            TransactionEvent.to_member_id,
+            func.sum(TransactionEvent.amount).label("amount")
+        ).where(
+            TransactionEvent.family_id == family_id,
+            TransactionEvent.status == "confirmed"
+        ).group_by(TransactionEvent.from_member_id, TransactionEvent.to_member_id)
+    )
+    for row in totals:
+        for member_id, delta in transfer_deltas(row.from_member_id, row.to_member_id, row.amount).items():
+            balances[member_id] = balances.get(member_id, Decimal(0)) + delta
+
+    set_balances(db, balances)
+    return balances
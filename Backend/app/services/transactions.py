@@ -0,0 +1,296 @@
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy.orm import Session
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import or_, insert
+
+from app.models.family import FamilyMember
+from app.models.transaction import TransactionEvent
+from app.schemas.transaction import (
+    TransactionEvent as TransactionEventSchema, TransactionEventCreate,
+    TransactionBatchCreate, TransactionBatchItemResult, TransactionBatchResult
+)
+from app.core.membership import require_member
+from app.core.pagination import paginate
+from app.core.etag import check_family_etag, commit_and_bump_version
+from app.services.idempotency import fingerprint, replay_or_claim, save_response
+from app.services.ledger import (
+    apply_balance_deltas, transfer_deltas, lock_balances, InsufficientBalanceError,
+    apply_spend, lock_spend, current_month, has_quota, QuotaExceededError
+)
+
+# 交易相关业务逻辑，只依赖同步 Session：
+# 同步模式下路由直接调用，异步模式下通过 AsyncSession.run_sync 调用
+
+
+def list_transactions(
+    db: Session,
+    user_id: UUID,
+    request: Request,
+    response: Response,
+    family_id: Optional[UUID] = None,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100
+):
+    """获取交易记录"""
+    query = db.query(TransactionEvent)
+    
+    if family_id:
+        # 检查用户是否是家庭成员
+        member = require_member(db, family_id, user_id)
+        check_family_etag(db, family_id, request, response)
+        query = query.filter(TransactionEvent.family_id == family_id)
+    else:
+        # 获取用户参与的所有交易
+        member_ids = [m.id for m in db.query(FamilyMember).filter(FamilyMember.user_id == user_id).all()]
+        query = query.filter(
+            or_(
+                TransactionEvent.from_member_id.in_(member_ids),
+                TransactionEvent.to_member_id.in_(member_ids)
+            )
+        )
+    
+    transactions = paginate(query, TransactionEvent, response, cursor=cursor, skip=skip, limit=limit)
+    return transactions
+
+
+def create_transaction(
+    db: Session,
+    user_id: UUID,
+    transaction_data: TransactionEventCreate,
+    idempotency_key: Optional[str] = None,
+    response: Optional[Response] = None
+) -> TransactionEventSchema:
+    """创建交易记录；带幂等键的重试直接返回首次请求的结果"""
+    stored = replay_or_claim(
+        db, user_id, idempotency_key, fingerprint("create_transaction", transaction_data), response
+    )
+    if stored is not None:
+        return TransactionEventSchema.model_validate(stored)
+    
+    party_ids = [m for m in (transaction_data.from_member_id, transaction_data.to_member_id) if m]
+    
+    # 一次查询同时校验当前用户的成员身份和交易双方
+    members = db.query(FamilyMember.id, FamilyMember.user_id, FamilyMember.monthly_quota).filter(
+        FamilyMember.family_id == transaction_data.family_id,
+        or_(
+            FamilyMember.user_id == user_id,
+            FamilyMember.id.in_(party_ids)
+        )
+    ).all()
+    if not any(m.user_id == user_id for m in members):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not a member of this family"
+        )
+    
+    member_ids = {m.id for m in members}
+    if transaction_data.from_member_id and transaction_data.from_member_id not in member_ids:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="From member not found"
+        )
+    if transaction_data.to_member_id and transaction_data.to_member_id not in member_ids:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="To member not found"
+        )
+    
+    # 创建交易事件
+    transaction = TransactionEvent(
+        family_id=transaction_data.family_id,
+        event_type=transaction_data.event_type,
+        amount=transaction_data.amount,
+        from_member_id=transaction_data.from_member_id,
+        to_member_id=transaction_data.to_member_id,
+        reference_id=transaction_data.reference_id,
+        description=transaction_data.description,
+        created_by=user_id
+    )
+    db.add(transaction)
+    
+    # 原子地更新双方余额快照，余额不足时整笔交易回滚
+    try:
+        apply_balance_deltas(db, transfer_deltas(
+            transaction_data.from_member_id,
+            transaction_data.to_member_id,
+            transaction_data.amount
+        ))
+    except InsufficientBalanceError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Insufficient balance"
+        )
+    
+    # 累加付款方当月支出，超出月度额度时整笔交易回滚
+    if transaction_data.from_member_id:
+        quotas = {m.id: m.monthly_quota for m in members}
+        try:
+            apply_spend(
+                db,
+                {transaction_data.from_member_id: transaction_data.amount},
+                quotas,
+                current_month()
+            )
+        except QuotaExceededError:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Monthly quota exceeded"
+            )
+    
+    db.flush()
+    # 提交前生成响应，避免提交后为刷新对象再查询一次
+    result = TransactionEventSchema.model_validate(transaction)
+    save_response(db, user_id, idempotency_key, result)
+    commit_and_bump_version(db, transaction_data.family_id)
+    
+    return result
+
+
+def create_transactions_batch(
+    db: Session,
+    user_id: UUID,
+    batch_data: TransactionBatchCreate,
+    idempotency_key: Optional[str] = None,
+    response: Optional[Response] = None
+) -> TransactionBatchResult:
+    """批量创建交易记录
+
+    按提交顺序逐条校验并在内存中模拟余额变化，最后一次性写入所有事件，
+    并按成员汇总余额变动后一次更新快照。带幂等键的重试直接返回首次提交的结果；
+    未提交的结果（全部失败或 all_or_nothing 回滚）不保存，重试时重新执行。
+    """
+    stored = replay_or_claim(
+        db, user_id, idempotency_key, fingerprint("create_transactions_batch", batch_data), response
+    )
+    if stored is not None:
+        return TransactionBatchResult.model_validate(stored)
+    
+    items = batch_data.items
+    family_ids = {item.family_id for item in items}
+    party_ids = {m for item in items for m in (item.from_member_id, item.to_member_id) if m}
+    
+    # 一次查询取出当前用户在各家庭的成员身份以及所有涉及的成员
+    members = db.query(FamilyMember.id, FamilyMember.family_id, FamilyMember.user_id, FamilyMember.monthly_quota).filter(
+        FamilyMember.family_id.in_(family_ids),
+        or_(
+            FamilyMember.user_id == user_id,
+            FamilyMember.id.in_(party_ids)
+        )
+    ).all()
+    joined_family_ids = {m.family_id for m in members if m.user_id == user_id}
+    member_families = {m.id: m.family_id for m in members}
+    quotas = {m.id: m.monthly_quota for m in members}
+    
+    # 锁定涉及成员的余额快照和当月支出，期间其他交易无法修改
+    balances = lock_balances(db, party_ids & member_families.keys())
+    month = current_month()
+    payer_ids = {item.from_member_id for item in items if item.from_member_id}
+    spent = lock_spend(db, payer_ids & member_families.keys(), month)
+    
+    results = []
+    accepted = []
+    net_deltas = {}
+    net_spend = {}
+    for index, item in enumerate(items):
+        error = None
+        if item.family_id not in joined_family_ids:
+            error = "You are not a member of this family"
+        elif item.from_member_id and member_families.get(item.from_member_id) != item.family_id:
+            error = "From member not found"
+        elif item.to_member_id and member_families.get(item.to_member_id) != item.family_id:
+            error = "To member not found"
+        
+        deltas = transfer_deltas(item.from_member_id, item.to_member_id, item.amount)
+        # 与逐条调用 create_transaction 的语义一致：无快照的成员不做余额校验
+        if error is None and any(
+            delta < 0 and member_id in balances and balances[member_id] + delta < 0
+            for member_id, delta in deltas.items()
+        ):
+            error = "Insufficient balance"
+        elif error is None and item.from_member_id and has_quota(quotas.get(item.from_member_id)) and (
+            spent.get(item.from_member_id, 0) + item.amount > quotas[item.from_member_id]
+        ):
+            error = "Monthly quota exceeded"
+        
+        if error is not None:
+            results.append(TransactionBatchItemResult(index=index, status="failed", error=error))
+            continue
+        
+        for member_id, delta in deltas.items():
+            balances[member_id] = balances.get(member_id, 0) + delta
+            net_deltas[member_id] = net_deltas.get(member_id, 0) + delta
+        if item.from_member_id:
+            spent[item.from_member_id] = spent.get(item.from_member_id, 0) + item.amount
+            net_spend[item.from_member_id] = net_spend.get(item.from_member_id, 0) + item.amount
+        accepted.append((index, item))
+        results.append(None)
+    
+    failed = len(items) - len(accepted)
+    if not accepted or (failed and batch_data.mode == "all_or_nothing"):
+        db.rollback()
+        for index, _ in accepted:
+            results[index] = TransactionBatchItemResult(index=index, status="skipped")
+        return TransactionBatchResult(committed=False, created=0, failed=failed, results=results)
+    
+    # 多行插入所有事件
+    transactions = db.scalars(
+        insert(TransactionEvent).returning(TransactionEvent, sort_by_parameter_order=True),
+        [
+            {
+                "family_id": item.family_id,
+                "event_type": item.event_type,
+                "amount": item.amount,
+                "from_member_id": item.from_member_id,
+                "to_member_id": item.to_member_id,
+                "reference_id": item.reference_id,
+                "description": item.description,
+                "created_by": user_id,
+            }
+            for _, item in accepted
+        ]
+    ).all()
+    
+    # 按成员汇总的余额变动和支出一次写入
+    try:
+        apply_balance_deltas(db, net_deltas)
+        apply_spend(db, net_spend, quotas, month)
+    except (InsufficientBalanceError, QuotaExceededError):
+        # 无快照或当月无支出的成员未被锁定，并发创建这些行后可能导致校验失败
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Balances changed concurrently, please retry"
+        )
+    
+    for (index, _), transaction in zip(accepted, transactions):
+        results[index] = TransactionBatchItemResult(
+            index=index,
+            status="created",
+            transaction=TransactionEventSchema.model_validate(transaction)
+        )
+    result = TransactionBatchResult(committed=True, created=len(accepted), failed=failed, results=results)
+    save_response(db, user_id, idempotency_key, result)
+    accepted_family_ids = {item.family_id for _, item in accepted}
+    commit_and_bump_version(db, *accepted_family_ids)
+    
+    return result
+
+
+def get_transaction(db: Session, user_id: UUID, request: Request, response: Response, transaction_id: UUID):
+    """获取交易详情"""
+    transaction = db.query(TransactionEvent).filter(TransactionEvent.id == transaction_id).first()
+    if not transaction:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Transaction not found"
+        )
+    
+    # 检查用户是否是家庭成员
+    member = require_member(db, transaction.family_id, user_id)
+    check_family_etag(db, transaction.family_id, request, response)
+    
+    return transaction
@@ -0,0 +1,166 @@
+"""对比同步与异步数据库模式下交易接口的吞吐和延迟
+
+分别以 DATABASE_ASYNC=false / true 启动 uvicorn，对同一数据库压测交易接口
+（70% GET /api/transactions?family_id=...，30% POST /api/transactions），
+输出每种模式下各接口的 requests/sec、错误率与 p50/p99 延迟（只统计成功的请求）。
+
+用法（在 Backend 目录下，需要可写的 PostgreSQL 数据库）：
+
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.bench_db_modes --concurrency 64 --duration 30
+    python -m benchmarks.bench_db_modes --json results/db_modes.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+from benchmarks.common import percentile, wait_until_ready
+
+# 每个成员的初始余额，远大于压测期间 0.01 的转账总额
+INITIAL_BALANCE = "10000.00"
+
+
+async def prepare(client: httpx.AsyncClient):
+    """注册两个用户并组成一个家庭，给每个成员一笔初始奖励，返回 (请求头, 家庭ID, 成员ID列表)
+
+    没有余额时转账会因余额不足返回 400，压测的就成了被拒绝的请求。
+    """
+    suffix = uuid.uuid4().hex[:8]
+    tokens = []
+    for name in ("bench-a", "bench-b"):
+        r = await client.post("/api/auth/register", json={"username": f"{name}-{suffix}", "password": "bench-password"})
+        r.raise_for_status()
+        tokens.append(r.json()["access_token"])
+    headers = [{"Authorization": f"Bearer {token}"} for token in tokens]
+
+    family = (await client.post("/api/families", json={"name": f"bench-{suffix}"}, headers=headers[0])).json()
+    (await client.post(f"/api/families/{family['id']}/join", headers=headers[1])).raise_for_status()
+    members = (await client.get(f"/api/families/{family['id']}/members", headers=headers[0])).json()
+    for member in members:
+        (await client.post("/api/transactions", headers=headers[0], json={
+            "family_id": family["id"],
+            "event_type": "reward",
+            "amount": INITIAL_BALANCE,
+            "to_member_id": member["id"],
+        })).raise_for_status()
+    return headers[0], family["id"], [m["id"] for m in members]
+
+
+async def run_load(base_url: str, concurrency: int, duration: float):
+    latencies = {"GET /api/transactions": [], "POST /api/transactions": []}
+    errors = {name: 0 for name in latencies}
+    statuses = {name: {} for name in latencies}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        headers, family_id, member_ids = await prepare(client)
+        deadline = time.monotonic() + duration
+
+        async def worker():
+            while time.monotonic() < deadline:
+                if random.random() < 0.7:
+                    name = "GET /api/transactions"
+                    request = client.get("/api/transactions", params={"family_id": family_id, "limit": 20}, headers=headers)
+                else:
+                    name = "POST /api/transactions"
+                    from_id, to_id = random.sample(member_ids, 2)
+                    request = client.post("/api/transactions", headers=headers, json={
+                        "family_id": family_id,
+                        "event_type": "transfer",
+                        "amount": "0.01",
+                        "from_member_id": from_id,
+                        "to_member_id": to_id,
+                    })
+                start = time.perf_counter()
+                response = await request
+                elapsed = time.perf_counter() - start
+                code = str(response.status_code)
+                statuses[name][code] = statuses[name].get(code, 0) + 1
+                if response.status_code >= 400:
+                    errors[name] += 1
+                else:
+                    latencies[name].append(elapsed)
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.monotonic() - started
+
+    total = sum(len(values) for values in latencies.values()) + sum(errors.values())
+    return {
+        "errors": sum(errors.values()),
+        "error_rate": round(sum(errors.values()) / total, 4) if total else 0.0,
+        "statuses": statuses,
+        "endpoints": {
+            name: {
+                "requests": len(values),
+                "errors": errors[name],
+                "error_rate": round(errors[name] / (len(values) + errors[name]), 4) if values or errors[name] else 0.0,
+                "rps": round(len(values) / wall, 1),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+            for name, values in latencies.items()
+        },
+    }
+
+
+def bench_mode(mode: str, args) -> dict:
+    env = dict(os.environ, DATABASE_ASYNC="true" if mode == "async" else "false")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env
+    )
+    try:
+        base_url = f"http://127.0.0.1:{args.port}"
+        asyncio.run(wait_until_ready(base_url))
+        return asyncio.run(run_load(base_url, args.concurrency, args.duration))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比同步/异步数据库模式的交易接口性能")
+    parser.add_argument("--modes", default="sync,async")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20, help="每种模式的压测时长（秒）")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", help="将结果写入 JSON 文件")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="任一模式的错误率超过该值时以状态码 1 退出")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes.split(","):
+        results[mode] = bench_mode(mode, args)
+
+    print(f"{'mode':<6} {'endpoint':<24} {'req/s':>8} {'errors':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode, result in results.items():
+        for name, stats in result["endpoints"].items():
+            print(
+                f"{mode:<6} {name:<24} {stats['rps']:>8} {stats['error_rate']:>8.2%} "
+                f"{stats['p50_ms']:>8} {stats['p99_ms']:>8}"
+            )
+        print(f"{mode:<6} statuses: {result['statuses']}")
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump({"concurrency": args.concurrency, "duration": args.duration, "results": results}, f, indent=2)
+
+    # 延迟只统计成功的请求，错误率过高时结果没有可比性
+    failed = [mode for mode, result in results.items() if result["error_rate"] > args.max_error_rate]
+    if failed:
+        print(f"error rate above {args.max_error_rate:.2%} in: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""对比两次 workload 运行的结果
+
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json
+"""
+import argparse
+import json
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比两次压测结果")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"before: {before.get('label') or ''} {before.get('commit')} {before.get('started_at')}")
+    print(f"after:  {after.get('label') or ''} {after.get('commit')} {after.get('started_at')}")
+    print(f"{'endpoint':<20} {'metric':<7} {'before':>10} {'after':>10} {'change':>8}")
+    names = list(before["endpoints"]) + [n for n in after["endpoints"] if n not in before["endpoints"]] + ["total"]
+    for name in names:
+        a = before["total"] if name == "total" else before["endpoints"].get(name)
+        b = after["total"] if name == "total" else after["endpoints"].get(name)
+        if not a or not b:
+            continue
+        for metric in ("rps", "p50_ms", "p95_ms", "p99_ms", "errors"):
+            print(f"{name:<20} {metric:<7} {a[metric]:>10} {b[metric]:>10} {_change(a[metric], b[metric]):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""生成基准测试用的合成数据：N 个家庭 × M 个成员 × 每个家庭 K 条交易事件
+
+所有用户使用同一个密码（哈希只计算一次），每个成员先获得一笔初始奖励，其余事件是成员间的
+随机转账，时间分布在最近 --days 天内。写入后按事件重建余额快照和当月支出计数，
+与线上数据的状态一致。生成的用户名、家庭、成员和任务ID写入清单文件，供 workload 使用。
+
+用法（在 Backend 目录下，需要已执行迁移的 PostgreSQL 数据库）：
+
+    python -m benchmarks.seed --families 200 --members 4 --events 2000 --out benchmarks/results/seed.json
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import insert
+
+from app.core.auth import get_password_hash
+from app.core.database import SessionLocal
+from app.models.family import Family, FamilyMember
+from app.models.task import BountyTask
+from app.models.transaction import TransactionEvent
+from app.models.user import User
+from app.services.ledger import current_month, rebuild_spend
+from app.services.replay import rebuild_family_balances
+from benchmarks.common import run_info, write_json
+
+INITIAL_BALANCE = Decimal("10000.00")
+INSERT_BATCH_SIZE = 5000
+
+
+def _insert(db, model, rows):
+    for i in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.execute(insert(model), rows[i:i + INSERT_BATCH_SIZE])
+
+
+def seed_family(db, rng: random.Random, run_id: str, index: int, args, password_hash: str, now: datetime) -> dict:
+    family_id = uuid.uuid4()
+    users = [
+        {
+            "id": uuid.uuid4(),
+            "nickname": f"bench {index}-{m}",
+            "user_name": f"bench-{run_id}-{index}-{m}",
+            "password_hash": password_hash,
+        }
+        for m in range(args.members)
+    ]
+    members = [
+        {
+            "id": uuid.uuid4(),
+            "family_id": family_id,
+            "user_id": user["id"],
+            "role": "admin" if m == 0 else "member",
+            "monthly_quota": 0,
+        }
+        for m, user in enumerate(users)
+    ]
+    member_ids = [member["id"] for member in members]
+    owner = users[0]["id"]
+    start = now - timedelta(days=args.days)
+
+    # 初始奖励，保证后续随机转账和压测中的转账不会因余额不足失败
+    events = [
+        {
+            "id": uuid.uuid4(), "family_id": family_id, "event_type": "reward", "amount": INITIAL_BALANCE,
+            "from_member_id": None, "to_member_id": member_id, "description": "initial balance",
+            "status": "confirmed", "created_by": owner, "created_at": start,
+        }
+        for member_id in member_ids
+    ]
+    offsets = sorted(rng.random() for _ in range(max(args.events - len(events), 0)))
+    for offset in offsets:
+        from_id, to_id = rng.sample(member_ids, 2)
+        events.append({
+            "id": uuid.uuid4(), "family_id": family_id, "event_type": "transfer",
+            "amount": Decimal(rng.randint(1, 5000)) / 100,
+            "from_member_id": from_id, "to_member_id": to_id, "description": None,
+            "status": "confirmed", "created_by": owner,
+            "created_at": start + (now - start) * offset,
+        })
+
+    tasks = [
+        {
+            "id": uuid.uuid4(), "family_id": family_id, "title": f"task {t}",
+            "reward_amount": Decimal(rng.randint(1, 100)), "created_by": member_ids[0],
+            "assigned_to": rng.choice(member_ids), "status": "open",
+        }
+        for t in range(args.tasks)
+    ]
+
+    db.execute(insert(User), users)
+    db.execute(insert(Family), [{"id": family_id, "name": f"bench family {index}", "created_by": owner}])
+    db.execute(insert(FamilyMember), members)
+    _insert(db, TransactionEvent, events)
+    if tasks:
+        db.execute(insert(BountyTask), tasks)
+    rebuild_family_balances(db, family_id)
+    rebuild_spend(db, set(member_ids), current_month())
+
+    return {
+        "id": str(family_id),
+        "users": [user["user_name"] for user in users],
+        "members": [str(member_id) for member_id in member_ids],
+        "tasks": [str(task["id"]) for task in tasks],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成基准测试数据")
+    parser.add_argument("--families", type=int, default=100)
+    parser.add_argument("--members", type=int, default=4, help="每个家庭的成员数（至少 2）")
+    parser.add_argument("--events", type=int, default=1000, help="每个家庭的交易事件数")
+    parser.add_argument("--tasks", type=int, default=5, help="每个家庭的任务数")
+    parser.add_argument("--days", type=int, default=180, help="事件时间分布的天数")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--random-seed", type=int, default=42, help="相同参数和随机种子生成相同分布的数据")
+    parser.add_argument("--out", default="benchmarks/results/seed.json", help="清单文件路径")
+    args = parser.parse_args()
+    if args.members < 2:
+        parser.error("--members must be at least 2")
+
+    rng = random.Random(args.random_seed)
+    run_id = uuid.uuid4().hex[:8]
+    password_hash = get_password_hash(args.password)
+    now = datetime.now(timezone.utc)
+
+    families = []
+    started = time.monotonic()
+    db = SessionLocal()
+    try:
+        for index in range(args.families):
+            families.append(seed_family(db, rng, run_id, index, args, password_hash, now))
+            db.commit()
+            if (index + 1) % 10 == 0 or index + 1 == args.families:
+                print(f"seeded {index + 1}/{args.families} families")
+    finally:
+        db.close()
+
+    write_json(args.out, {
+        **run_info(),
+        "run_id": run_id,
+        "password": args.password,
+        "params": {k: getattr(args, k) for k in ("families", "members", "events", "tasks", "days", "random_seed")},
+        "seconds": round(time.monotonic() - started, 1),
+        "families": families,
+    })
+    print(f"wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
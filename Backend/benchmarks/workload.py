@@ -0,0 +1,223 @@
+"""按小程序的调用模式压测 API，输出每个接口的吞吐和 p50/p95/p99 延迟
+
+每个虚拟用户从 seed 清单中选一个家庭成员登录，之后按权重随机发起请求，权重参照
+WeApp/utils/api.js 中页面的调用频率：
+
+    login             POST /api/auth/login
+    list_families     GET  /api/families
+    list_transactions GET  /api/transactions?family_id=...&limit=20
+    create_transfer   POST /api/transactions（成员间转账 0.01）
+    update_task       PUT  /api/tasks/{task_id}
+
+可以压测已启动的服务（--base-url），也可以在当前进程内直接调用应用（--in-process，
+使用 httpx 的 ASGI 传输，压测端与应用共用一个事件循环，适合对比代码改动而不是测量绝对容量）。
+结果写入 JSON，可用 benchmarks.compare 对比两次运行。
+
+用法（在 Backend 目录下）：
+
+    python -m benchmarks.seed --out benchmarks/results/seed.json
+    python -m benchmarks.workload --seed benchmarks/results/seed.json --base-url http://127.0.0.1:8000 \\
+        --concurrency 32 --duration 30 --json benchmarks/results/run.json
+    DATABASE_POOL_SIZE=5 python -m benchmarks.workload --seed benchmarks/results/seed.json --in-process
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.common import run_info, summarize, wait_until_ready, write_json
+
+DEFAULT_MIX = "login=5,list_families=20,list_transactions=40,create_transfer=20,update_task=15"
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation: {name}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+class VirtualUser:
+    """一个已登录的小程序用户"""
+
+    def __init__(self, client: httpx.AsyncClient, family: dict, index: int, password: str, rng: random.Random):
+        self.client = client
+        self.family = family
+        self.username = family["users"][index]
+        self.member_id = family["members"][index]
+        self.password = password
+        self.rng = rng
+        self.headers = {}
+
+    async def login(self):
+        response = await self.client.post(
+            "/api/auth/login", json={"username": self.username, "password": self.password}
+        )
+        if response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return response
+
+    async def list_families(self):
+        return await self.client.get("/api/families", headers=self.headers)
+
+    async def list_transactions(self):
+        return await self.client.get(
+            "/api/transactions", params={"family_id": self.family["id"], "limit": 20}, headers=self.headers
+        )
+
+    async def create_transfer(self):
+        to_id = self.rng.choice([m for m in self.family["members"] if m != self.member_id])
+        return await self.client.post("/api/transactions", headers=self.headers, json={
+            "family_id": self.family["id"],
+            "event_type": "transfer",
+            "amount": "0.01",
+            "from_member_id": self.member_id,
+            "to_member_id": to_id,
+        })
+
+    async def update_task(self):
+        if not self.family["tasks"]:
+            return await self.list_families()
+        task_id = self.rng.choice(self.family["tasks"])
+        return await self.client.put(
+            f"/api/tasks/{task_id}", json={"title": f"task {self.rng.randint(0, 9999)}"}, headers=self.headers
+        )
+
+
+OPERATIONS = {
+    "login": VirtualUser.login,
+    "list_families": VirtualUser.list_families,
+    "list_transactions": VirtualUser.list_transactions,
+    "create_transfer": VirtualUser.create_transfer,
+    "update_task": VirtualUser.update_task,
+}
+
+
+async def run_workload(client: httpx.AsyncClient, manifest: dict, args) -> dict:
+    mix = args.mix
+    names, weights = list(mix), list(mix.values())
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    statuses = defaultdict(lambda: defaultdict(int))
+    rng = random.Random(args.random_seed)
+
+    users = []
+    for _ in range(args.concurrency):
+        family = rng.choice(manifest["families"])
+        user = VirtualUser(client, family, rng.randrange(len(family["users"])), manifest["password"],
+                           random.Random(rng.random()))
+        (await user.login()).raise_for_status()
+        users.append(user)
+
+    async def worker(user: VirtualUser, deadline: float, record: bool):
+        while time.monotonic() < deadline:
+            name = user.rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await OPERATIONS[name](user)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            if not record:
+                continue
+            statuses[name][str(status)] += 1
+            if isinstance(status, int) and status < 400:
+                latencies[name].append(elapsed)
+            else:
+                errors[name] += 1
+
+    # 预热：填充连接池和各级缓存，不计入结果
+    if args.warmup > 0:
+        deadline = time.monotonic() + args.warmup
+        await asyncio.gather(*(worker(user, deadline, False) for user in users))
+
+    started = time.monotonic()
+    deadline = started + args.duration
+    await asyncio.gather(*(worker(user, deadline, True) for user in users))
+    wall = time.monotonic() - started
+
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "wall_seconds": round(wall, 2),
+        "total": summarize([v for values in latencies.values() for v in values], sum(errors.values()), wall),
+        "endpoints": {name: summarize(latencies[name], errors[name], wall) for name in names},
+        "statuses": {name: dict(codes) for name, codes in statuses.items()},
+        "throughput_rps": round(total / wall, 1),
+    }
+
+
+async def run(args, manifest: dict) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.in_process:
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        base_url = "http://bench"
+    else:
+        transport = None
+        base_url = args.base_url
+        await wait_until_ready(base_url)
+    async with httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=args.timeout) as client:
+        result = await run_workload(client, manifest, args)
+        if args.scrape_metrics and not args.in_process:
+            result["metrics"] = (await client.get("/metrics")).text
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按小程序调用模式压测 API")
+    parser.add_argument("--seed", required=True, help="benchmarks.seed 生成的清单文件")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--base-url", default="http://127.0.0.1:8000")
+    target.add_argument("--in-process", action="store_true", help="在当前进程内调用应用")
+    parser.add_argument("--concurrency", type=int, default=32, help="虚拟用户数")
+    parser.add_argument("--duration", type=float, default=30, help="压测时长（秒）")
+    parser.add_argument("--warmup", type=float, default=5, help="预热时长（秒），不计入结果")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help=f"操作权重，默认 {DEFAULT_MIX}")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--random-seed", type=int, default=1)
+    parser.add_argument("--scrape-metrics", action="store_true", help="结束后抓取服务端 /metrics 一并保存")
+    parser.add_argument("--label", help="写入结果的说明，如 pool_size=5")
+    parser.add_argument("--json", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    with open(args.seed) as f:
+        manifest = json.load(f)
+
+    result = asyncio.run(run(args, manifest))
+
+    print(f"{'endpoint':<20} {'req/s':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, stats in {**result["endpoints"], "total": result["total"]}.items():
+        print(f"{name:<20} {stats['rps']:>8} {stats['errors']:>7} {stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}")
+
+    if args.json:
+        write_json(args.json, {
+            **run_info(),
+            "label": args.label,
+            "target": "in-process" if args.in_process else args.base_url,
+            "params": {
+                "concurrency": args.concurrency,
+                "duration": args.duration,
+                "warmup": args.warmup,
+                "mix": args.mix,
+                "random_seed": args.random_seed,
+                "seed_params": manifest.get("params"),
+            },
+            # 仅对 --in-process 有效；压测外部服务时以服务端的环境变量为准
+            "env": {key: os.environ[key] for key in sorted(os.environ) if key.startswith("DATABASE_") and key != "DATABASE_URL"},
+            **result,
+        })
+        print(f"wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
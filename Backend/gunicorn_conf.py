@@ -0,0 +1,61 @@
+"""生产环境 gunicorn 配置：多个 uvicorn 工作进程，预加载应用，按请求数回收工作进程
+
+    gunicorn -c gunicorn_conf.py app.main:app
+
+通过环境变量调整（均有默认值）：
+
+    WEB_CONCURRENCY            工作进程数，默认 CPU 核数
+    BIND                       监听地址，默认 0.0.0.0:8000
+    MAX_REQUESTS               每个工作进程处理多少请求后重启，默认 2000（0 为不回收）
+    MAX_REQUESTS_JITTER        回收阈值的随机偏移，避免所有进程同时重启，默认 200
+    GRACEFUL_TIMEOUT           重启/停止时等待进行中请求完成的秒数，默认 30
+    TIMEOUT                    工作进程无响应多少秒后被强制重启，默认 60
+    DATABASE_MAX_CONNECTIONS   所有工作进程合计的数据库连接上限，见 app/core/database.py
+    DATABASE_SPARE_WORKERS     均分连接上限时为回收中的工作进程预留的份数，默认 1
+
+信号：HUP 平滑重启全部工作进程（不重新加载预加载的代码，更新代码需重启主进程）；
+TERM 平滑停止。连接池按启动时的 WEB_CONCURRENCY 划分，不要用 TTIN 增加工作进程，
+新增的进程不在划分之内，会使连接总数超过 DATABASE_MAX_CONNECTIONS。
+"""
+import multiprocessing
+import os
+
+workers = int(os.environ.get("WEB_CONCURRENCY") or multiprocessing.cpu_count())
+# 应用按 WEB_CONCURRENCY 均分数据库连接上限，须在预加载应用之前设置
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+
+# 在主进程中导入应用一次，工作进程 fork 后共享已加载的代码，启动更快、内存更省
+preload_app = True
+
+max_requests = int(os.environ.get("MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.environ.get("MAX_REQUESTS_JITTER", "200"))
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.environ.get("TIMEOUT", "60"))
+keepalive = 5
+
+# 访问日志由 uvicorn.access 经应用的日志队列输出，这里只保留 gunicorn 自身的日志
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    """工作进程不能复用主进程的数据库连接和日志线程"""
+    from app.core.database import dispose_engines_after_fork
+    from app.core.logging_config import restart_logging_after_fork
+
+    dispose_engines_after_fork()
+    restart_logging_after_fork()
+
+
+def when_ready(server):
+    from app.core.config import settings
+    from app.core.database import engines_per_process, pool_limits
+
+    pool_size, max_overflow = pool_limits(engines_per_process)
+    server.log.info(
+        "%d workers (+%d spare) x %d engines, pool_size=%d max_overflow=%d per engine",
+        workers, settings.database_spare_workers, engines_per_process, pool_size, max_overflow
+    )
@@ -0,0 +1,56 @@
+"""add indexes for hot queries
+
+Revision ID: 306cca9815a2
+Revises: 3b289bf0bae0
+Create Date: 2026-10-18 10:12:07.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '306cca9815a2'
+down_revision = '3b289bf0bae0'
+branch_labels = None
+depends_on = None
+
+
+# (索引名, 表名, 列, 部分索引条件)
+# 列表接口按 (created_at DESC, id DESC) 排序和键集分页，索引列顺序与之保持一致
+INDEXES = [
+    # family_id + user_id 的成员校验已由唯一约束 _family_user_uc 覆盖，这里补充按用户查所有家庭
+    ('ix_family_members_user_id', 'family_members', ['user_id'], None),
+    ('ix_transaction_events_family_created', 'transaction_events', ['family_id', 'created_at DESC', 'id DESC'], None),
+    ('ix_transaction_events_from_member_created', 'transaction_events', ['from_member_id', 'created_at DESC', 'id DESC'], None),
+    ('ix_transaction_events_to_member_created', 'transaction_events', ['to_member_id', 'created_at DESC', 'id DESC'], None),
+    ('ix_bounty_tasks_family_created', 'bounty_tasks', ['family_id', 'created_at DESC', 'id DESC'], None),
+    ('ix_bounty_tasks_family_open', 'bounty_tasks', ['family_id', 'created_at DESC'], "status = 'open'"),
+    ('ix_bounty_tasks_created_by', 'bounty_tasks', ['created_by'], None),
+    ('ix_bounty_tasks_assigned_to', 'bounty_tasks', ['assigned_to'], None),
+    ('ix_rewards_family_created', 'rewards', ['family_id', 'created_at DESC', 'id DESC'], None),
+    ('ix_rewards_family_pending', 'rewards', ['family_id', 'created_at DESC'], "status = 'pending'"),
+    ('ix_rewards_member_created', 'rewards', ['member_id', 'created_at DESC', 'id DESC'], None),
+    ('ix_services_family_active', 'services', ['family_id', 'created_at DESC', 'id DESC'], "status = 'active'"),
+    ('ix_services_provider_active', 'services', ['provider_id', 'created_at DESC', 'id DESC'], "status = 'active'"),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY 不能在事务中执行，建索引期间不阻塞表的读写
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                [sa.text(column) for column in columns],
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
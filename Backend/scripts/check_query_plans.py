@@ -0,0 +1,168 @@
+"""检查列表接口的查询计划
+
+在一个事务中向数据库灌入大量模拟数据并 ANALYZE，然后对各列表接口使用的查询执行
+EXPLAIN，只要大表上出现 Seq Scan 就以非零状态码退出。事务最后回滚，不会留下数据，
+但灌数据期间会持有写锁，建议在测试库上运行。
+
+用法（在 Backend 目录下）：
+
+    python -m scripts.check_query_plans
+    python -m scripts.check_query_plans --families 1000 --events 2000
+"""
+import argparse
+import json
+import sys
+
+from sqlalchemy import create_engine, or_, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Family, FamilyMember, TransactionEvent, BountyTask, Reward, Service
+
+# 这些表在真实数据中会持续增长，不允许出现全表扫描
+LARGE_TABLES = {"family_members", "transaction_events", "bounty_tasks", "rewards", "services"}
+
+SEED_SQL = [
+    # 每个成员对应一个用户
+    """
+    INSERT INTO users (id, nickname)
+    SELECT md5('user' || i)::uuid, 'plan-check'
+    FROM generate_series(1, :families * :members) AS i
+    """,
+    """
+    INSERT INTO families (id, name, created_by)
+    SELECT md5('family' || f)::uuid, 'plan-check', md5('user' || ((f - 1) * :members + 1))::uuid
+    FROM generate_series(1, :families) AS f
+    """,
+    """
+    INSERT INTO family_members (id, family_id, user_id, role)
+    SELECT md5('member' || ((f - 1) * :members + m))::uuid, md5('family' || f)::uuid,
+           md5('user' || ((f - 1) * :members + m))::uuid, CASE WHEN m = 1 THEN 'admin' ELSE 'member' END
+    FROM generate_series(1, :families) AS f, generate_series(1, :members) AS m
+    """,
+    """
+    INSERT INTO transaction_events (id, family_id, event_type, amount, from_member_id, to_member_id,
+                                    status, created_by, created_at)
+    SELECT md5('event' || f || '-' || e)::uuid, md5('family' || f)::uuid, 'transfer', 1,
+           md5('member' || ((f - 1) * :members + e % :members + 1))::uuid,
+           md5('member' || ((f - 1) * :members + (e + 1) % :members + 1))::uuid,
+           'confirmed', md5('user' || ((f - 1) * :members + 1))::uuid,
+           now() - e * interval '1 minute'
+    FROM generate_series(1, :families) AS f, generate_series(1, :events) AS e
+    """,
+    """
+    INSERT INTO bounty_tasks (id, family_id, title, reward_amount, created_by, assigned_to, status, created_at)
+    SELECT md5('task' || f || '-' || t)::uuid, md5('family' || f)::uuid, 'plan-check', 1,
+           md5('member' || ((f - 1) * :members + t % :members + 1))::uuid,
+           md5('member' || ((f - 1) * :members + (t + 1) % :members + 1))::uuid,
+           CASE WHEN t % 10 = 0 THEN 'open' ELSE 'completed' END,
+           now() - t * interval '1 hour'
+    FROM generate_series(1, :families) AS f, generate_series(1, :items) AS t
+    """,
+    """
+    INSERT INTO rewards (id, family_id, member_id, amount, status, created_at)
+    SELECT md5('reward' || f || '-' || r)::uuid, md5('family' || f)::uuid,
+           md5('member' || ((f - 1) * :members + r % :members + 1))::uuid, 1,
+           CASE WHEN r % 10 = 0 THEN 'pending' ELSE 'approved' END,
+           now() - r * interval '1 hour'
+    FROM generate_series(1, :families) AS f, generate_series(1, :items) AS r
+    """,
+    """
+    INSERT INTO services (id, family_id, title, price, provider_id, status, created_at)
+    SELECT md5('service' || f || '-' || s)::uuid, md5('family' || f)::uuid, 'plan-check', 1,
+           md5('member' || ((f - 1) * :members + s % :members + 1))::uuid,
+           CASE WHEN s % 10 = 0 THEN 'active' ELSE 'inactive' END,
+           now() - s * interval '1 hour'
+    FROM generate_series(1, :families) AS f, generate_series(1, :items) AS s
+    """,
+]
+
+
+def list_queries(db: Session, family_id, user_id, limit: int = 100):
+    """与各列表接口一致的查询"""
+    member_ids = [m.id for m in db.query(FamilyMember).filter(FamilyMember.user_id == user_id).all()]
+
+    def page(query, model):
+        return query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+    return {
+        "membership": db.query(FamilyMember).filter(
+            FamilyMember.family_id == family_id,
+            FamilyMember.user_id == user_id
+        ),
+        "families": page(db.query(Family).join(FamilyMember).filter(FamilyMember.user_id == user_id), Family),
+        "family_members": db.query(FamilyMember).filter(FamilyMember.family_id == family_id),
+        "transactions_by_family": page(
+            db.query(TransactionEvent).filter(TransactionEvent.family_id == family_id), TransactionEvent
+        ),
+        "transactions_by_member": page(db.query(TransactionEvent).filter(or_(
+            TransactionEvent.from_member_id.in_(member_ids),
+            TransactionEvent.to_member_id.in_(member_ids)
+        )), TransactionEvent),
+        "tasks_by_family": page(db.query(BountyTask).filter(BountyTask.family_id == family_id), BountyTask),
+        "tasks_by_member": page(db.query(BountyTask).filter(
+            (BountyTask.created_by.in_(member_ids)) | (BountyTask.assigned_to.in_(member_ids))
+        ), BountyTask),
+        "rewards_by_family": page(db.query(Reward).filter(Reward.family_id == family_id), Reward),
+        "rewards_by_member": page(db.query(Reward).filter(Reward.member_id.in_(member_ids)), Reward),
+        "services_by_family": page(db.query(Service).filter(
+            Service.status == "active", Service.family_id == family_id
+        ), Service),
+        "services_by_member": page(db.query(Service).filter(
+            Service.status == "active", Service.provider_id.in_(member_ids)
+        ), Service),
+    }
+
+
+def seq_scans(plan: dict):
+    """遍历计划树，返回所有 Seq Scan 的表名"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="检查列表接口的查询是否走索引")
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--families", type=int, default=500)
+    parser.add_argument("--members", type=int, default=6)
+    parser.add_argument("--events", type=int, default=1000, help="每个家庭的交易数")
+    parser.add_argument("--items", type=int, default=200, help="每个家庭的任务、奖励、服务数")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    params = {"families": args.families, "members": args.members, "events": args.events, "items": args.items}
+    failures = []
+
+    with Session(engine) as db:
+        try:
+            for sql in SEED_SQL:
+                db.execute(text(sql), params)
+            db.execute(text("ANALYZE"))
+
+            family_id = db.execute(text("SELECT md5('family1')::uuid")).scalar()
+            user_id = db.execute(text("SELECT md5('user2')::uuid")).scalar()
+            for name, query in list_queries(db, family_id, user_id).items():
+                sql = str(query.statement.compile(
+                    dialect=postgresql.dialect(),
+                    compile_kwargs={"literal_binds": True}
+                ))
+                plan = db.execute(text("EXPLAIN (FORMAT JSON) " + sql)).scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                scanned = sorted(set(seq_scans(plan[0]["Plan"])) & LARGE_TABLES)
+                print(f"{'FAIL' if scanned else 'ok  '} {name}" + (f" (Seq Scan on {', '.join(scanned)})" if scanned else ""))
+                if scanned:
+                    failures.append(name)
+        finally:
+            db.rollback()
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
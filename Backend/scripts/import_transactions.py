@@ -0,0 +1,47 @@
+"""从 CSV 文件批量导入家庭的历史交易
+
+CSV 格式见 app/services/importer.py。导入完成后重建该家庭的余额快照和当月支出计数。
+任一行有误时不导入任何数据，并以状态码 1 退出。
+
+用法（在 Backend 目录下）：
+
+    python -m scripts.import_transactions --family-id <uuid> history.csv
+    python -m scripts.import_transactions --family-id <uuid> --created-by <user uuid> history.csv
+"""
+import argparse
+import sys
+from uuid import UUID
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Family
+from app.services.importer import import_transactions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="从 CSV 导入历史交易")
+    parser.add_argument("file", help="CSV 文件路径")
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--family-id", type=UUID, required=True)
+    parser.add_argument("--created-by", type=UUID, help="记录的创建用户，默认为家庭创建者")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with Session(engine) as db:
+        family = db.get(Family, args.family_id)
+        if family is None:
+            print(f"family {args.family_id} not found", file=sys.stderr)
+            return 1
+        with open(args.file, encoding="utf-8-sig", newline="") as f:
+            result = import_transactions(db, family.id, args.created_by or family.created_by, f)
+
+    for error in result.errors:
+        print(f"line {error.line}: {error.error}", file=sys.stderr)
+    print(f"imported {result.imported} transactions" if result.committed else "nothing imported")
+    return 0 if result.committed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""删除过期的幂等键
+
+幂等键保留 IDEMPOTENCY_KEY_TTL_HOURS 小时，过期后不再被使用，适合每小时定时运行一次。
+分批删除并逐批提交，避免长事务。
+
+用法（在 Backend 目录下）：
+
+    python -m scripts.purge_idempotency_keys
+    python -m scripts.purge_idempotency_keys --batch-size 5000
+"""
+import argparse
+import sys
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.idempotency import purge_expired
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="删除过期的幂等键")
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    deleted = 0
+    with Session(engine) as db:
+        while True:
+            count = purge_expired(db, args.batch_size)
+            deleted += count
+            if count < args.batch_size:
+                break
+
+    print(f"deleted {deleted} expired idempotency keys")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
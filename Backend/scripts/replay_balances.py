@@ -0,0 +1,87 @@
+"""由交易事件重放校验（并可修复）所有家庭的成员余额快照
+
+按家庭拆分任务，在进程池中并行重放；每个工作进程使用自己的数据库连接，
+事件通过服务端游标分批读取，不会一次性载入内存。存在不一致时以状态码 1 退出。
+
+用法（在 Backend 目录下）：
+
+    python -m scripts.replay_balances
+    python -m scripts.replay_balances --workers 8 --repair
+    python -m scripts.replay_balances --family-id <uuid> --json drift.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from uuid import UUID
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Family
+from app.services.replay import replay_family
+
+# 工作进程内的数据库引擎，由 init_worker 创建
+_engine = None
+
+
+def init_worker(database_url: str):
+    """每个工作进程创建自己的引擎，不与父进程共享连接"""
+    global _engine
+    _engine = create_engine(database_url, pool_size=1, max_overflow=0)
+
+
+def replay_one(family_id: UUID, repair: bool) -> dict:
+    with Session(_engine) as db:
+        return replay_family(db, family_id, repair=repair).model_dump(mode="json")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="由交易事件重放校验成员余额快照")
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--family-id", action="append", type=UUID, help="只处理指定家庭，可重复")
+    parser.add_argument("--repair", action="store_true", help="将不一致的快照修复为重放结果")
+    parser.add_argument("--json", help="将不一致的明细写入 JSON 文件")
+    args = parser.parse_args()
+
+    family_ids = args.family_id
+    if not family_ids:
+        engine = create_engine(args.database_url)
+        with Session(engine) as db:
+            family_ids = list(db.scalars(select(Family.id).order_by(Family.id)))
+        engine.dispose()
+
+    started = time.monotonic()
+    events = 0
+    drifted = []
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=init_worker,
+        initargs=(args.database_url,)
+    ) as pool:
+        futures = [pool.submit(replay_one, family_id, args.repair) for family_id in family_ids]
+        for future in as_completed(futures):
+            report = future.result()
+            events += report["events"]
+            if report["drifts"]:
+                drifted.append(report)
+                action = "repaired" if report["repaired"] else "DRIFT"
+                print(f"{action} family {report['family_id']}: {len(report['drifts'])} member(s)")
+
+    elapsed = time.monotonic() - started
+    print(f"replayed {events} events in {len(family_ids)} families in {elapsed:.1f}s, "
+          f"{len(drifted)} famil{'y' if len(drifted) == 1 else 'ies'} with drift")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(drifted, f, indent=2, ensure_ascii=False)
+
+    return 1 if drifted and not args.repair else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
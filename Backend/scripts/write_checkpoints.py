@@ -0,0 +1,58 @@
+"""为所有家庭写入余额检查点
+
+默认检查点时间为当天零点（UTC），适合每天定时运行一次；也可以更频繁地运行并用
+--min-events 只给新增事件足够多的家庭写检查点。每个家庭单独提交。
+
+用法（在 Backend 目录下）：
+
+    python -m scripts.write_checkpoints
+    python -m scripts.write_checkpoints --as-of 2026-10-01T00:00:00+00:00
+    python -m scripts.write_checkpoints --as-of now --min-events 1000
+"""
+import argparse
+import sys
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Family
+from app.services.checkpoints import CHECKPOINT_GRACE, write_checkpoint
+
+
+def default_as_of() -> datetime:
+    """最近一个已超过等待时间的 UTC 零点"""
+    now = datetime.now(timezone.utc) - CHECKPOINT_GRACE
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="写入成员余额检查点")
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--as-of", help="检查点时间（ISO 8601），now 表示当前时间减去等待时间")
+    parser.add_argument("--min-events", type=int, default=1, help="距上一个检查点至少新增的事件数")
+    args = parser.parse_args()
+
+    if args.as_of == "now":
+        as_of = datetime.now(timezone.utc) - CHECKPOINT_GRACE
+    elif args.as_of:
+        as_of = datetime.fromisoformat(args.as_of)
+    else:
+        as_of = default_as_of()
+
+    engine = create_engine(args.database_url)
+    written = 0
+    with Session(engine) as db:
+        family_ids = list(db.scalars(select(Family.id).order_by(Family.id)))
+        for family_id in family_ids:
+            if write_checkpoint(db, family_id, as_of, min_events=args.min_events):
+                written += 1
+            db.commit()
+
+    print(f"wrote checkpoints at {as_of.isoformat()} for {written} of {len(family_ids)} families")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
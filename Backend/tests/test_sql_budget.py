@@ -0,0 +1,72 @@
+"""在 SQL_BUDGET_MODE=enforce 下调用声明了 @sql_budget 的接口
+
+超出预算或出现重复语句时，中间件抛出 QueryBudgetExceeded，TestClient 把它抛给测试。
+"""
+# 交易相关的热点接口必须声明预算
+BUDGETED_ROUTES = {
+    ("GET", "/api/transactions"),
+    ("POST", "/api/transactions"),
+    ("POST", "/api/transactions/batch"),
+    ("GET", "/api/transactions/{transaction_id}"),
+    ("GET", "/api/rewards"),
+}
+
+
+def test_hot_routes_declare_budgets():
+    from app.main import app
+
+    declared = {
+        (method, route.path)
+        for route in app.routes
+        if getattr(getattr(route, "endpoint", None), "sql_budget", None) is not None
+        for method in getattr(route, "methods", ())
+    }
+    assert BUDGETED_ROUTES <= declared, BUDGETED_ROUTES - declared
+
+
+def _transfer(family_id, from_id, to_id, amount="1.00"):
+    return {
+        "family_id": family_id,
+        "event_type": "transfer",
+        "amount": amount,
+        "from_member_id": from_id,
+        "to_member_id": to_id,
+    }
+
+
+def test_transaction_routes_within_budget(cold, family):
+    headers, family_id, (owner_id, member_id) = family
+
+    response = cold("POST", "/api/transactions", headers=headers, json={
+        "family_id": family_id, "event_type": "reward", "amount": "100.00", "to_member_id": owner_id,
+    })
+    assert response.status_code == 200, response.text
+
+    response = cold("POST", "/api/transactions", headers=headers, json=_transfer(family_id, owner_id, member_id))
+    assert response.status_code == 200, response.text
+    transaction_id = response.json()["id"]
+
+    # 首次请求占用幂等键，重放直接返回保存的响应
+    idempotent = {**headers, "Idempotency-Key": "budget-single"}
+    body = _transfer(family_id, owner_id, member_id)
+    assert cold("POST", "/api/transactions", headers=idempotent, json=body).status_code == 200
+    replay = cold("POST", "/api/transactions", headers=idempotent, json=body)
+    assert replay.status_code == 200
+    assert replay.headers.get("Idempotent-Replayed") == "true"
+
+    # 批量接口的语句数与条数无关
+    items = [_transfer(family_id, owner_id, member_id, "0.10") for _ in range(50)]
+    response = cold("POST", "/api/transactions/batch", headers={**headers, "Idempotency-Key": "budget-batch"}, json={"items": items})
+    assert response.status_code == 200, response.text
+    assert response.json()["created"] == 50
+
+    assert cold("GET", "/api/transactions", headers=headers, params={"family_id": family_id}).status_code == 200
+    assert cold("GET", "/api/transactions", headers=headers).status_code == 200
+    assert cold("GET", f"/api/transactions/{transaction_id}", headers=headers).status_code == 200
+
+
+def test_reward_list_within_budget(cold, family):
+    headers, family_id, _ = family
+
+    assert cold("GET", "/api/rewards", headers=headers, params={"family_id": family_id}).status_code == 200
+    assert cold("GET", "/api/rewards", headers=headers).status_code == 200
@@ -27,7 +27,34 @@ export function isLoggedIn() {
   return !!getToken();
 }
 
+// GET 响应缓存：key -> { etag, data }，数据未变化时后端返回 304，直接使用缓存
+const etagCache = {};
+
+// 生成幂等键：同一次提交的所有重试使用同一个键，后端只执行一次
+function newIdempotencyKey() {
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+}
+
+// 发送请求，网络失败（未收到响应）时按 retries 重试
+function sendRequest(params, retries) {
+  return new Promise((resolve, reject) => {
+    wx.request({
+      ...params,
+      success: resolve,
+      fail: (err) => {
+        if (retries > 0) {
+          console.log('API 请求失败，重试:', params.url);
+          setTimeout(() => sendRequest(params, retries - 1).then(resolve, reject), 500);
+        } else {
+          reject(err);
+        }
+      }
+    });
+  });
+}
+
 // 通用请求方法
+// options.retries：网络失败时的重试次数，只应用于 GET 或带 Idempotency-Key 的写请求
 async function request(url, options = {}) {
   const headers = {
     'Content-Type': 'application/json',
@@ -40,27 +67,36 @@ async function request(url, options = {}) {
     headers['Authorization'] = `Bearer ${token}`;
   }
 
+  const method = options.method || 'GET';
+  const cacheKey = method === 'GET' ? `${token}|${url}|${JSON.stringify(options.data || {})}` : null;
+  const cached = cacheKey && etagCache[cacheKey];
+  if (cached) {
+    headers['If-None-Match'] = cached.etag;
+  }
+
   console.log('API 请求 - URL:', `${API_BASE_URL}${url}`);
   console.log('API 请求 - 方法:', options.method || 'GET');
   console.log('API 请求 - 数据:', options.data);
   console.log('API 请求 - 头部:', headers);
 
   try {
-    const response = await new Promise((resolve, reject) => {
-      wx.request({
-        url: `${API_BASE_URL}${url}`,
-        method: options.method || 'GET',
-        data: options.data,
-        header: headers,
-        success: resolve,
-        fail: reject
-      });
-    });
+    const response = await sendRequest({
+      url: `${API_BASE_URL}${url}`,
+      method: options.method || 'GET',
+      data: options.data,
+      header: headers
+    }, options.retries || 0);
     
     console.log('API 响应 - 状态码:', response.statusCode);
     console.log('API 响应 - 数据:', response.data);
 
-    if (response.statusCode >= 200 && response.statusCode < 300) {
+    if (response.statusCode === 304 && cached) {
+      return cached.data;
+    } else if (response.statusCode >= 200 && response.statusCode < 300) {
+      const etag = response.header && (response.header['ETag'] || response.header['etag']);
+      if (cacheKey && etag) {
+        etagCache[cacheKey] = { etag, data: response.data };
+      }
       return response.data;
     } else if (response.statusCode === 401) {
       // 未授权，清除 token 并跳转到登录页
@@ -206,11 +242,13 @@ export const transactionAPI = {
     return request('/transactions');
   },
 
-  // 创建交易记录
+  // 创建交易记录；网络失败时以同一个幂等键重试，不会重复扣款
   async createTransaction(data) {
     return request('/transactions', {
       method: 'POST',
-      data
+      data,
+      headers: { 'Idempotency-Key': newIdempotencyKey() },
+      retries: 2
     });
   },
 